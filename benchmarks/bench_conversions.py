@@ -0,0 +1,415 @@
+﻿import os
+import sys
+import json
+import math
+import time
+import zlib
+import struct
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+import rpgmic_core
+
+SEED = 2000
+
+IMAGE_SIZES = {
+    "charset": (288, 256),
+    "chipset": (480, 256),
+    "picture": (320, 240),
+    "panorama": (640, 480),
+    "large_panorama": (2560, 1920),
+}
+
+COLOR_COUNTS = (16, 256)
+
+FOLDER_CORPUS = {
+    "charset": 40,
+    "chipset": 20,
+    "picture": 20,
+    "panorama": 8,
+    "large_panorama": 1,
+}
+
+INPUT_EXTENSIONS = {
+    "xyz2png": ".xyz",
+    "png2xyz": ".png",
+    "to256colors": ".png",
+}
+
+
+def synthetic_indices(rng, width, height, colors):
+    data = bytearray()
+    while len(data) < width * height:
+        data.extend(bytes([rng.randrange(colors)]) * rng.randint(1, 16))
+    return bytes(data[: width * height])
+
+
+def synthetic_palette(rng, colors):
+    palette = bytearray()
+    seen = set()
+    while len(seen) < colors:
+        color = bytes(rng.randrange(256) for _ in range(3))
+        if color not in seen:
+            seen.add(color)
+            palette.extend(color)
+    return bytes(palette).ljust(768, b"\0")
+
+
+def write_sample(path, conversion_type, width, height, colors, seed):
+    rng = random.Random(seed)
+    if conversion_type == "to256colors":
+        channels = [
+            Image.frombytes(
+                "L", (width, height), synthetic_indices(rng, width, height, 256)
+            )
+            for _ in range(3)
+        ]
+        Image.merge("RGB", channels).save(path)
+        return
+    palette = synthetic_palette(rng, colors)
+    indices = synthetic_indices(rng, width, height, colors)
+    if conversion_type == "xyz2png":
+        with open(path, "wb") as f:
+            f.write(b"XYZ1")
+            f.write(struct.pack("=HH", width, height))
+            f.write(zlib.compress(palette + indices))
+        return
+    image = Image.frombytes("P", (width, height), indices)
+    image.putpalette(palette)
+    image.convert("RGB").save(path)
+
+
+def case_variants(conversion_type, quantizers, encoders):
+    if conversion_type != "to256colors":
+        quantizers = [None]
+    variants = []
+    for quantizer in quantizers:
+        for encoder in encoders:
+            suffix = ""
+            options = {}
+            if quantizer:
+                options["quantizer"] = quantizer
+                if quantizer != rpgmic_core.DEFAULT_QUANTIZER:
+                    suffix += f"/{quantizer}"
+            if encoder != rpgmic_core.DEFAULT_ENCODER:
+                suffix += f"/{encoder}-compression"
+                options["encoder"] = rpgmic_core.encoder_options(encoder)
+            variants.append((suffix, options))
+    return variants
+
+
+def build_cases(conversion_types, sizes, workers, quantizers, encoders):
+    cases = []
+    corpus = "mixed" if set(sizes) == set(IMAGE_SIZES) else "+".join(sizes)
+    for conversion_type in conversion_types:
+        color_counts = (None,) if conversion_type == "to256colors" else COLOR_COUNTS
+        for suffix, options in case_variants(conversion_type, quantizers, encoders):
+            for size_name in sizes:
+                width, height = IMAGE_SIZES[size_name]
+                for colors in color_counts:
+                    name = f"{conversion_type}/file/{size_name}"
+                    if colors:
+                        name += f"/{colors}colors"
+                    cases.append(
+                        {
+                            "name": name + suffix,
+                            "conversion_type": conversion_type,
+                            "mode": "file",
+                            "options": options,
+                            "samples": [(size_name, width, height, colors or 256, 1)],
+                        }
+                    )
+            cases.append(
+                {
+                    "name": f"{conversion_type}/folder/{corpus}{suffix}",
+                    "conversion_type": conversion_type,
+                    "mode": "folder",
+                    "workers": workers,
+                    "options": options,
+                    "samples": [
+                        (
+                            size_name,
+                            *IMAGE_SIZES[size_name],
+                            256,
+                            FOLDER_CORPUS[size_name],
+                        )
+                        for size_name in sizes
+                    ],
+                }
+            )
+    return cases
+
+
+def generate_corpus(case, workdir):
+    case_dir = os.path.join(workdir, case["name"].replace("/", "_"))
+    input_dir = os.path.join(case_dir, "input")
+    os.makedirs(input_dir, exist_ok=True)
+    extension = INPUT_EXTENSIONS[case["conversion_type"]]
+    seed = SEED
+    for size_name, width, height, colors, count in case["samples"]:
+        for number in range(count):
+            seed += 1
+            path = os.path.join(input_dir, size_name, f"{number:04d}{extension}")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write_sample(path, case["conversion_type"], width, height, colors, seed)
+    case["input_dir"] = input_dir
+    case["output_dir"] = os.path.join(case_dir, "output")
+    case["files"] = sum(sample[4] for sample in case["samples"])
+    case["pixels"] = sum(
+        sample[1] * sample[2] * sample[4] for sample in case["samples"]
+    )
+
+
+def rms_error(case):
+    squared_error = 0
+    samples = 0
+    parent_dir = os.path.dirname(case["input_dir"])
+    extension = rpgmic_core.EXTENSIONS[case["conversion_type"]][1]
+    for root, _, files in os.walk(case["input_dir"]):
+        output_dir = case["output_dir"]
+        if case["mode"] == "folder":
+            output_dir = os.path.join(output_dir, os.path.relpath(root, parent_dir))
+        for file in files:
+            output_path = os.path.join(
+                output_dir, rpgmic_core.output_filename(file, extension)
+            )
+            with Image.open(os.path.join(root, file)) as source, Image.open(
+                output_path
+            ) as output:
+                difference = ImageChops.difference(
+                    source.convert("RGB"), output.convert("RGB")
+                )
+            squared_error += sum(
+                count * (value % 256) ** 2
+                for value, count in enumerate(difference.histogram())
+            )
+            samples += difference.width * difference.height * 3
+    return math.sqrt(squared_error / samples)
+
+
+def run_case(case, repeat):
+    timings = []
+    for attempt in range(repeat + 1):
+        shutil.rmtree(case["output_dir"], ignore_errors=True)
+        if case["mode"] == "file":
+            converter = rpgmic_core.CONVERTERS[case["conversion_type"]]
+            input_path = next(
+                os.path.join(root, file)
+                for root, _, files in os.walk(case["input_dir"])
+                for file in files
+            )
+            output_path = os.path.join(
+                case["output_dir"],
+                rpgmic_core.output_filename(
+                    os.path.basename(input_path),
+                    rpgmic_core.EXTENSIONS[case["conversion_type"]][1],
+                ),
+            )
+            start_time = time.perf_counter()
+            success, message = converter(input_path, output_path, **case["options"])
+            timings.append(time.perf_counter() - start_time)
+            errors = [] if success else [message]
+        else:
+            batch = rpgmic_core.BatchConverter(
+                case["conversion_type"],
+                case["input_dir"],
+                case["output_dir"],
+                case["workers"],
+                options=case["options"],
+                force=True,
+            )
+            start_time = time.perf_counter()
+            _, errors = batch.run()
+            timings.append(time.perf_counter() - start_time)
+        if errors:
+            raise RuntimeError(f"{case['name']}: {errors[0]}")
+    seconds = min(timings[1:])
+    result = {
+        "files": case["files"],
+        "pixels": case["pixels"],
+        "output_bytes": sum(
+            os.path.getsize(os.path.join(root, file))
+            for root, _, files in os.walk(case["output_dir"])
+            for file in files
+            if not file.startswith(".")
+        ),
+        "seconds": seconds,
+        "files_per_second": case["files"] / seconds,
+        "pixels_per_second": case["pixels"] / seconds,
+        "peak_rss": rpgmic_core.peak_memory_usage(),
+    }
+    if case["conversion_type"] == "to256colors":
+        result["rms_error"] = rms_error(case)
+    return result
+
+
+def run_case_subprocess(case, repeat):
+    completed = subprocess.run(
+        [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--run-case",
+            json.dumps(case),
+            "--repeat",
+            str(repeat),
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        if (base.get("files"), base.get("pixels")) != (
+            result["files"],
+            result["pixels"],
+        ):
+            print(
+                f"Skipping {name}: the baseline used a different corpus",
+                file=sys.stderr,
+            )
+            continue
+        if result["files_per_second"] < base["files_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{name}: {result['files_per_second']:.2f} files/s "
+                f"(baseline {base['files_per_second']:.2f})"
+            )
+        if (
+            result["peak_rss"]
+            and base.get("peak_rss")
+            and result["peak_rss"] > base["peak_rss"] * (1 + threshold)
+        ):
+            regressions.append(
+                f"{name}: peak RSS {result['peak_rss'] / (1024 * 1024):.1f} MB "
+                f"(baseline {base['peak_rss'] / (1024 * 1024):.1f} MB)"
+            )
+        if "rms_error" in result and "rms_error" in base:
+            if result["rms_error"] > base["rms_error"] * (1 + threshold):
+                regressions.append(
+                    f"{name}: RMS error {result['rms_error']:.2f} "
+                    f"(baseline {base['rms_error']:.2f})"
+                )
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the XYZ/PNG conversion paths on synthetic corpora."
+    )
+    parser.add_argument(
+        "--paths",
+        nargs="+",
+        choices=sorted(INPUT_EXTENSIONS),
+        default=["xyz2png", "png2xyz", "to256colors"],
+        help="conversion paths to benchmark",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        choices=list(IMAGE_SIZES),
+        default=list(IMAGE_SIZES),
+        help="image sizes to include",
+    )
+    parser.add_argument(
+        "--quantizers",
+        nargs="+",
+        choices=list(rpgmic_core.QUANTIZERS),
+        default=[rpgmic_core.DEFAULT_QUANTIZER],
+        help="to256colors quantizer presets to include",
+    )
+    parser.add_argument(
+        "--encoders",
+        nargs="+",
+        choices=list(rpgmic_core.ENCODER_PRESETS),
+        default=[rpgmic_core.DEFAULT_ENCODER],
+        help="output compression presets to include",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="timed runs per case after one warm-up run, the best is kept",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="worker processes for folder cases"
+    )
+    parser.add_argument("--workdir", help="where to generate the corpora")
+    parser.add_argument("-o", "--output", help="write the JSON results here")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed relative regression before failing (default: 0.1)",
+    )
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run_case:
+        json.dump(run_case(json.loads(args.run_case), args.repeat), sys.stdout)
+        return 0
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rpgmic-bench-")
+    results = {
+        "meta": {
+            "seed": SEED,
+            "python": platform.python_version(),
+            "pillow": Image.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "workers": args.workers,
+        },
+        "cases": {},
+    }
+    try:
+        for case in build_cases(
+            args.paths, args.sizes, args.workers, args.quantizers, args.encoders
+        ):
+            generate_corpus(case, workdir)
+            result = run_case_subprocess(case, args.repeat)
+            results["cases"][case["name"]] = result
+            line = (
+                f"{case['name']:<60} {result['files_per_second']:10.2f} files/s "
+                f"{result['pixels_per_second'] / 1e6:10.2f} Mpx/s "
+                f"{result['output_bytes'] / 1024:10.1f} KB"
+            )
+            if "rms_error" in result:
+                line += f" {result['rms_error']:8.2f} RMS"
+            print(line, file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+﻿import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SPECS = {
+    "onefile": "rpgmic.spec",
+    "fast": "rpgmic_fast.spec",
+}
+
+MODES = {
+    "gui": [],
+    "cli": ["--help"],
+}
+
+STARTUP_PROBE_ENV = "RPGMIC_EXIT_AFTER_SHOW"
+
+
+def path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(root, file))
+        for root, _, files in os.walk(path)
+        for file in files
+        if not os.path.islink(os.path.join(root, file))
+    )
+
+
+def bundle_path(executable):
+    bundle = os.path.dirname(executable)
+    if os.path.isdir(os.path.join(bundle, "_internal")):
+        return bundle
+    return executable
+
+
+def build_spec(name, spec, workdir):
+    dist_dir = os.path.join(workdir, "dist", name)
+    start_time = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "PyInstaller",
+            "--noconfirm",
+            "--log-level",
+            "WARN",
+            "--distpath",
+            dist_dir,
+            "--workpath",
+            os.path.join(workdir, "build", name),
+            os.path.join(ROOT, spec),
+        ],
+        cwd=ROOT,
+        check=True,
+    )
+    build_seconds = time.perf_counter() - start_time
+    executable = "rpgmic.exe" if os.name == "nt" else "rpgmic"
+    executable = os.path.join(dist_dir, executable)
+    if not os.path.isfile(executable):
+        executable = os.path.join(dist_dir, "rpgmic", os.path.basename(executable))
+    return executable, path_size(bundle_path(executable)), build_seconds
+
+
+def startup_env():
+    env = dict(os.environ, **{STARTUP_PROBE_ENV: "1"})
+    if (
+        sys.platform.startswith("linux")
+        and not env.get("DISPLAY")
+        and not env.get("WAYLAND_DISPLAY")
+    ):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return env
+
+
+def time_startup(command, repeat, env):
+    timings = []
+    for attempt in range(repeat + 1):
+        start_time = time.perf_counter()
+        completed = subprocess.run(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=ROOT,
+        )
+        timings.append(time.perf_counter() - start_time)
+        if completed.returncode:
+            raise RuntimeError(
+                f"{' '.join(command)} exited with {completed.returncode}: "
+                f"{completed.stderr.decode(errors='replace').strip()}"
+            )
+    return {
+        "seconds": min(timings[1:]),
+        "median_seconds": statistics.median(timings[1:]),
+        "first_seconds": timings[0],
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if not base:
+            continue
+        if result["seconds"] > base["seconds"] * (1 + threshold):
+            regressions.append(
+                f"{name}: {result['seconds'] * 1000:.0f} ms "
+                f"(baseline {base['seconds'] * 1000:.0f} ms)"
+            )
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark how long rpgmic takes to start, from source and frozen."
+    )
+    parser.add_argument(
+        "--build",
+        nargs="*",
+        choices=sorted(SPECS),
+        help="build these PyInstaller specs first and time them (default: all)",
+    )
+    parser.add_argument(
+        "--exe",
+        action="append",
+        default=[],
+        metavar="NAME=PATH",
+        help="time an already built executable, may be given more than once",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=list(MODES),
+        default=list(MODES),
+        help="gui opens the main window and quits, cli prints --help",
+    )
+    parser.add_argument(
+        "--no-source",
+        action="store_true",
+        help="skip timing `python rpgmic.py`",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="timed launches per case after one cold launch, the best is kept",
+    )
+    parser.add_argument("--workdir", help="where to put the builds")
+    parser.add_argument("-o", "--output", help="write the JSON results here")
+    parser.add_argument("--compare", help="baseline JSON results to compare against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="allowed relative regression before failing (default: 0.1)",
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    targets = {}
+    if not args.no_source:
+        targets["source"] = (
+            [sys.executable, os.path.join(ROOT, "rpgmic.py")],
+            None,
+            None,
+        )
+    for exe in args.exe:
+        name, _, path = exe.partition("=")
+        if not path:
+            raise SystemExit(f"--exe expects NAME=PATH, got {exe}")
+        path = os.path.abspath(path)
+        targets[name] = ([path], path_size(bundle_path(path)), None)
+    workdir = None
+    if args.build is not None:
+        workdir = args.workdir or tempfile.mkdtemp(prefix="rpgmic-startup-")
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "targets": {},
+        "cases": {},
+    }
+    env = startup_env()
+    try:
+        for name in args.build or (sorted(SPECS) if workdir else []):
+            executable, size, build_seconds = build_spec(name, SPECS[name], workdir)
+            targets[name] = ([executable], size, build_seconds)
+        for name, (command, size, build_seconds) in targets.items():
+            results["targets"][name] = {
+                "command": command,
+                "bundle_bytes": size,
+                "build_seconds": build_seconds,
+            }
+            for mode in args.modes:
+                case = f"{name}/{mode}"
+                result = time_startup(command + MODES[mode], args.repeat, env)
+                results["cases"][case] = result
+                print(
+                    f"{case:<30} {result['seconds'] * 1000:8.0f} ms best "
+                    f"{result['median_seconds'] * 1000:8.0f} ms median "
+                    f"{result['first_seconds'] * 1000:8.0f} ms cold",
+                    file=sys.stderr,
+                )
+    finally:
+        if workdir and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
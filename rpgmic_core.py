@@ -0,0 +1,2262 @@
+﻿import sys
+import io
+import os
+import math
+import array
+import hashlib
+import functools
+import collections
+import bisect
+import heapq
+import csv
+import json
+import queue
+import ctypes
+import select
+import struct
+import zlib
+import time
+import shutil
+import signal
+import zipfile
+import contextlib
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from PIL import Image, UnidentifiedImageError
+
+
+XYZ_CHUNK_SIZE = 64 * 1024
+XYZ_BAND_ROWS = 64
+MAX_DEFLATE_RATIO = 1032
+
+
+class ConversionStats:
+    enabled = True
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.start_time = self.last_time = time.perf_counter()
+        self.total_time = 0.0
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self.last_time
+        self.last_time = now
+
+    def count(self, counter, value):
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def finish(self):
+        self.total_time = time.perf_counter() - self.start_time
+
+
+class NullStats:
+    enabled = False
+
+    def mark(self, stage):
+        pass
+
+    def count(self, counter, value):
+        pass
+
+
+NULL_STATS = NullStats()
+
+CANCELLED_MESSAGE = "Cancelled"
+cancel_event = None
+
+
+class ConversionCancelled(Exception):
+    def __init__(self):
+        super().__init__(CANCELLED_MESSAGE)
+
+
+def set_cancel_event(event):
+    global cancel_event
+    cancel_event = event
+
+
+def init_worker(event):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    set_cancel_event(event)
+
+
+def is_cancelled():
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def check_cancelled(event):
+    if event is not None and event.is_set():
+        raise ConversionCancelled()
+
+
+class XYZStream:
+    def __init__(self, input_fh, chunk_size=XYZ_CHUNK_SIZE, stats=NULL_STATS):
+        self.input_fh = input_fh
+        self.chunk_size = chunk_size
+        self.stats = stats
+        self.decompressor = zlib.decompressobj()
+        self.pending = b""
+        self.input_done = False
+
+    def read_into(self, buffer):
+        view = memoryview(buffer)
+        filled = 0
+        while filled < len(view):
+            if not self.pending and not self.input_done:
+                self.pending = self.input_fh.read(self.chunk_size)
+                self.input_done = not self.pending
+                self.stats.mark("read")
+            data = self.decompressor.decompress(self.pending, len(view) - filled)
+            self.pending = self.decompressor.unconsumed_tail
+            if not data:
+                if self.input_done or self.decompressor.eof:
+                    break
+                continue
+            view[filled : filled + len(data)] = data
+            filled += len(data)
+            self.stats.mark("decompress")
+        return filled
+
+
+class BufferReader:
+    def __init__(self, data):
+        self.view = memoryview(data).cast("B")
+        self.offset = 0
+
+    def read(self, size=-1):
+        start = self.offset
+        end = len(self.view) if size < 0 else min(start + size, len(self.view))
+        self.offset = end
+        return self.view[start:end]
+
+
+def check_xyz_size(width, height, compressed_size):
+    pixels = width * height
+    if Image.MAX_IMAGE_PIXELS and pixels > Image.MAX_IMAGE_PIXELS:
+        return f"Image is too large ({width}x{height})"
+    if compressed_size * MAX_DEFLATE_RATIO < 768 + pixels:
+        return "Truncated image data"
+    return None
+
+
+def peak_memory_usage():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+ARCHIVE_EXTENSION = ".zip"
+
+
+def is_archive_path(path):
+    return isinstance(path, str) and path.lower().endswith(ARCHIVE_EXTENSION)
+
+
+@functools.lru_cache(maxsize=8)
+def cached_archive(archive_path, mtime_ns, size):
+    return zipfile.ZipFile(archive_path)
+
+
+def open_archive(archive_path):
+    stat = os.stat(archive_path)
+    return cached_archive(archive_path, stat.st_mtime_ns, stat.st_size)
+
+
+class ArchiveMember:
+    def __init__(self, archive_path, info):
+        self.archive_path = archive_path
+        self.name = info.filename
+        self.size = info.file_size
+        self.crc = info.CRC
+        self.date_time = info.date_time
+        self.mtime_ns = int(time.mktime(info.date_time + (0, 0, -1))) * 10**9
+
+    def __str__(self):
+        return os.path.join(self.archive_path, *self.name.split("/"))
+
+    def read(self):
+        return open_archive(self.archive_path).read(self.name)
+
+
+class PrefetchedInput:
+    def __init__(self, source, data):
+        self.source = source
+        self.data = data
+        self.size = len(data)
+        self.mtime_ns = None
+
+    def __str__(self):
+        return str(self.source)
+
+    def read(self):
+        return self.data
+
+
+def prefetch_input(input_path):
+    if isinstance(input_path, ArchiveMember):
+        return PrefetchedInput(input_path, input_path.read())
+    with open(input_path, "rb") as fh:
+        return PrefetchedInput(input_path, fh.read())
+
+
+def open_input(input_path):
+    if isinstance(input_path, (ArchiveMember, PrefetchedInput)):
+        return io.BytesIO(input_path.read())
+    return open(input_path, "rb")
+
+
+def open_image(input_fh, input_path):
+    try:
+        return Image.open(input_fh)
+    except UnidentifiedImageError:
+        raise UnidentifiedImageError(
+            f"cannot identify image file {str(input_path)!r}"
+        ) from None
+
+
+def source_stat(input_path):
+    if isinstance(input_path, (ArchiveMember, PrefetchedInput)):
+        return input_path.size, input_path.mtime_ns
+    stat = os.stat(input_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def source_date_time(input_path):
+    if isinstance(input_path, ArchiveMember):
+        return input_path.date_time
+    date_time = time.localtime(source_stat(input_path)[1] / 10**9)[:6]
+    return max(date_time, (1980, 1, 1, 0, 0, 0))
+
+
+def make_output_dir(output_path):
+    if isinstance(output_path, str):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+
+PARTIAL_SUFFIX = ".part"
+
+
+@contextlib.contextmanager
+def open_output(output_path):
+    if not isinstance(output_path, str):
+        yield output_path
+        return
+    temp_path = output_path + PARTIAL_SUFFIX
+    try:
+        with open(temp_path, "wb") as fh:
+            yield fh
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+DEDUP_MODES = ("copy", "link")
+DEFAULT_DEDUP = "copy"
+
+
+def link_output(source_path, output_path, hardlink=False):
+    make_output_dir(output_path)
+    temp_path = output_path + PARTIAL_SUFFIX
+    try:
+        if hardlink:
+            try:
+                os.link(source_path, temp_path)
+            except OSError:
+                hardlink = False
+        if not hardlink:
+            shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def output_size(output_path):
+    if isinstance(output_path, str):
+        return os.path.getsize(output_path)
+    return output_path.getbuffer().nbytes
+
+
+ZLIB_STRATEGIES = {
+    "default": zlib.Z_DEFAULT_STRATEGY,
+    "filtered": zlib.Z_FILTERED,
+    "huffman": zlib.Z_HUFFMAN_ONLY,
+    "rle": zlib.Z_RLE,
+    "fixed": zlib.Z_FIXED,
+}
+
+
+class EncoderSettings:
+    def __init__(self, level=6, strategy="default", optimize=False):
+        if not 0 <= level <= 9:
+            raise ValueError(f"Compression level must be 0-9, not {level}")
+        if strategy not in ZLIB_STRATEGIES:
+            raise ValueError(f"Unknown zlib strategy: {strategy}")
+        self.level = level
+        self.strategy = strategy
+        self.optimize = optimize
+
+    def compressobj(self):
+        return zlib.compressobj(
+            self.level,
+            zlib.DEFLATED,
+            zlib.MAX_WBITS,
+            zlib.DEF_MEM_LEVEL,
+            ZLIB_STRATEGIES[self.strategy],
+        )
+
+    def png_params(self):
+        params = {"compress_level": self.level, "optimize": self.optimize}
+        if self.strategy != "default":
+            params["compress_type"] = ZLIB_STRATEGIES[self.strategy]
+        return params
+
+    def as_options(self):
+        return {
+            "level": self.level,
+            "strategy": self.strategy,
+            "optimize": self.optimize,
+        }
+
+
+ENCODER_PRESETS = {
+    "fast": EncoderSettings(level=1),
+    "default": EncoderSettings(),
+    "smallest": EncoderSettings(level=9, optimize=True),
+}
+DEFAULT_ENCODER = "default"
+
+
+def encoder_options(preset=DEFAULT_ENCODER, level=None, strategy=None):
+    options = ENCODER_PRESETS[preset].as_options()
+    if level is not None:
+        options["level"] = level
+    if strategy is not None:
+        options["strategy"] = strategy
+    if options == ENCODER_PRESETS[DEFAULT_ENCODER].as_options():
+        return None
+    return options
+
+
+XYZ_MAGIC = b"XYZ1"
+XYZ_HEADER = struct.Struct("=4sHH")
+XYZ_MAX_SIZE = 0xFFFF
+PNG_MODES = ("P", "RGBA")
+
+
+def read_xyz_indices(input_fh, input_size, stats=NULL_STATS, cancel_event=None):
+    header = bytes(input_fh.read(XYZ_HEADER.size))
+    if header[:4] != XYZ_MAGIC:
+        raise ValueError(f"Unsupported file format: {header[:4]}")
+    if len(header) < XYZ_HEADER.size:
+        raise ValueError("Truncated image data")
+    _, width, height = XYZ_HEADER.unpack(header)
+    message = check_xyz_size(width, height, input_size - XYZ_HEADER.size)
+    if message:
+        raise ValueError(message)
+    stats.mark("read")
+    stream = XYZStream(input_fh, stats=stats)
+    palette = bytearray(768)
+    if stream.read_into(palette) < len(palette):
+        raise ValueError("Truncated image data")
+    index_data = bytearray(width * height)
+    band_size = max(width, 1) * XYZ_BAND_ROWS
+    for start in range(0, len(index_data), band_size):
+        check_cancelled(cancel_event)
+        band = memoryview(index_data)[start : start + band_size]
+        if stream.read_into(band) < len(band):
+            raise ValueError("Truncated image data")
+    stats.count("pixels", width * height)
+    return (width, height), palette, index_data
+
+
+def xyz_image(size, palette, index_data):
+    img = Image.frombuffer("P", size, index_data, "raw", "P", 0, 1)
+    img.putpalette(palette)
+    return img
+
+
+def decode_xyz_indices(data, stats=NULL_STATS, cancel_event=None):
+    reader = BufferReader(data)
+    return read_xyz_indices(reader, len(reader.view), stats, cancel_event)
+
+
+def decode_xyz(data, stats=NULL_STATS, cancel_event=None):
+    return xyz_image(*decode_xyz_indices(data, stats, cancel_event))
+
+
+def encode_xyz_indices(
+    size, palette, index_data, encoder=None, stats=NULL_STATS, cancel_event=None
+):
+    settings = EncoderSettings(**(encoder or {}))
+    width, height = size
+    if width > XYZ_MAX_SIZE or height > XYZ_MAX_SIZE:
+        raise ValueError(f"Image is too large for XYZ ({width}x{height})")
+    indices = memoryview(index_data).cast("B")
+    if len(indices) != width * height:
+        raise ValueError(
+            f"Index data has {len(indices)} bytes, not {width * height} "
+            f"for a {width}x{height} image"
+        )
+    palette = memoryview(palette).cast("B")[:768]
+    compressor = settings.compressobj()
+    output = bytearray(XYZ_HEADER.pack(XYZ_MAGIC, width, height))
+    output += compressor.compress(palette)
+    output += compressor.compress(bytes(768 - len(palette)))
+    band_size = max(width, 1) * XYZ_BAND_ROWS
+    for start in range(0, len(indices), band_size):
+        check_cancelled(cancel_event)
+        output += compressor.compress(indices[start : start + band_size])
+    output += compressor.flush()
+    stats.mark("compress")
+    return output
+
+
+def image_indices(img, stats=NULL_STATS):
+    stats.count("pixels", img.width * img.height)
+    if img.mode == "P":
+        palette_data = bytes(img.getpalette()[:768])
+        index_data = img.tobytes()
+        if stats.enabled:
+            stats.count("palette_colors", sum(1 for count in img.histogram() if count))
+        stats.mark("palette")
+        return palette_data, index_data
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    stats.mark("pixels")
+    if img.getcolors(256) is None:
+        raise ValueError("Image has more than 256 colors")
+    pixels = array.array("I", img.tobytes("raw", "RGBX"))
+    color_to_index = {color: index for index, color in enumerate(dict.fromkeys(pixels))}
+    palette_data = b"".join(
+        color.to_bytes(4, sys.byteorder)[:3] for color in color_to_index
+    )
+    stats.count("palette_colors", len(color_to_index))
+    stats.mark("palette")
+    index_data = bytes(map(color_to_index.__getitem__, pixels))
+    stats.mark("pixels")
+    return palette_data, index_data
+
+
+def encode_xyz(img, encoder=None, stats=NULL_STATS, cancel_event=None):
+    return encode_xyz_indices(
+        img.size, *image_indices(img, stats), encoder, stats, cancel_event
+    )
+
+
+def convert_xyz_to_png(
+    input_path, output_path, png_mode="P", encoder=None, stats=NULL_STATS
+):
+    try:
+        settings = EncoderSettings(**(encoder or {}))
+        if png_mode not in PNG_MODES:
+            return False, f"Unsupported PNG mode: {png_mode}"
+        with open_input(input_path) as input_fh:
+            input_size = source_stat(input_path)[0]
+            stats.count("bytes_in", input_size)
+            output_image = xyz_image(
+                *read_xyz_indices(input_fh, input_size, stats, cancel_event)
+            )
+        if png_mode == "RGBA":
+            output_image = output_image.convert("RGBA")
+        stats.mark("pixels")
+        make_output_dir(output_path)
+        stats.mark("makedirs")
+        check_cancelled(cancel_event)
+        with open_output(output_path) as output_fh:
+            output_image.save(output_fh, format="PNG", **settings.png_params())
+        stats.mark("save")
+        if stats.enabled:
+            stats.count("bytes_out", output_size(output_path))
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def used_palette_entries(img):
+    histogram = img.histogram()[:256]
+    used = max((index for index, count in enumerate(histogram) if count), default=0)
+    transparency = img.info.get("transparency")
+    if isinstance(transparency, int):
+        used = max(used, transparency)
+    elif isinstance(transparency, bytes):
+        used = max(used, len(transparency) - 1)
+    return used + 1
+
+
+def trim_palette(img):
+    palette = img.getpalette()
+    used = used_palette_entries(img)
+    if palette and len(palette) > used * 3:
+        img.putpalette(palette[: used * 3])
+    return img
+
+
+RGBA_QUANTIZE_METHODS = (Image.FASTOCTREE, Image.LIBIMAGEQUANT)
+
+
+def exact_palette_image(img):
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGB")
+    if img.mode == "RGB":
+        pixels = array.array("I", img.tobytes("raw", "RGBX"))
+    else:
+        pixels = array.array("I", img.tobytes())
+    color_to_index = {color: index for index, color in enumerate(dict.fromkeys(pixels))}
+    entries = [color.to_bytes(4, sys.byteorder) for color in color_to_index]
+    output_image = Image.frombytes(
+        "P", img.size, bytes(map(color_to_index.__getitem__, pixels))
+    )
+    output_image.putpalette(b"".join(entry[:3] for entry in entries))
+    if img.mode == "RGBA":
+        alpha = bytes(entry[3] for entry in entries)
+        if alpha.count(255) < len(alpha):
+            output_image.info["transparency"] = alpha
+    return output_image
+
+
+class Quantizer:
+    def __init__(self, method, kmeans=0, memory_per_pixel=48):
+        self.method = method
+        self.kmeans = kmeans
+        self.memory_per_pixel = memory_per_pixel
+
+    def quantize(self, img, colors=256):
+        if img.mode not in ("L", "RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        if img.getcolors(colors) is not None:
+            return exact_palette_image(img)
+        method = self.method
+        if img.mode == "RGBA" and method not in RGBA_QUANTIZE_METHODS:
+            method = Image.FASTOCTREE
+        return img.quantize(
+            colors, method=method, kmeans=self.kmeans, dither=Image.NONE
+        )
+
+
+QUANTIZERS = {
+    "fast": Quantizer(Image.FASTOCTREE, memory_per_pixel=14),
+    "balanced": Quantizer(Image.MEDIANCUT),
+    "quality": Quantizer(Image.MEDIANCUT, kmeans=1),
+}
+DEFAULT_QUANTIZER = "balanced"
+
+SHARED_PALETTE_AUTO = "auto"
+SHARED_PALETTE_IMAGE_COLORS = 4096
+SHARED_PALETTE_IMAGE_PIXELS = 256 * 256
+SHARED_PALETTE_SAMPLE_PIXELS = 4 * 1024 * 1024
+PALETTE_FILENAME = "rpgmic-palette.png"
+PALETTE_CUBE_SHIFT = 3
+PALETTE_CELL_RADIUS = math.sqrt(3) * (1 << PALETTE_CUBE_SHIFT) / 2
+
+
+def has_alpha(img):
+    return "A" in img.getbands() or "transparency" in img.info
+
+
+def transparent_index(img):
+    transparency = img.info.get("transparency")
+    if isinstance(transparency, int):
+        return transparency
+    if isinstance(transparency, bytes) and 0 in transparency:
+        return transparency.index(0)
+    return None
+
+
+def image_color_counts(img):
+    mode = "RGBA" if has_alpha(img) else "RGB"
+    if img.mode != mode:
+        img = img.convert(mode)
+    colors = img.getcolors(SHARED_PALETTE_IMAGE_COLORS)
+    weight = 1.0
+    if colors is None:
+        pixels = img.width * img.height
+        scale = math.sqrt(SHARED_PALETTE_IMAGE_PIXELS / pixels)
+        if scale < 1:
+            img = img.resize(
+                (max(1, round(img.width * scale)), max(1, round(img.height * scale))),
+                Image.NEAREST,
+            )
+        colors = img.getcolors(img.width * img.height)
+        weight = pixels / (img.width * img.height)
+    if mode == "RGBA":
+        colors = [(count, color[:3] if color[3] else None) for count, color in colors]
+    return colors, weight
+
+
+def build_shared_palette(input_paths, quantizer=DEFAULT_QUANTIZER):
+    histogram = collections.Counter()
+    for input_path in input_paths:
+        try:
+            with open_input(input_path) as input_fh, open_image(
+                input_fh, input_path
+            ) as img:
+                colors, weight = image_color_counts(img)
+        except Exception:
+            continue
+        for count, color in colors:
+            histogram[color] += count * weight
+    transparent = histogram.pop(None, 0)
+    colors = 255 if transparent else 256
+    if len(histogram) <= colors:
+        palette = b"".join(bytes(color) for color, _ in histogram.most_common())
+    else:
+        scale = min(1.0, SHARED_PALETTE_SAMPLE_PIXELS / sum(histogram.values()))
+        data = b"".join(
+            bytes(color) * max(1, round(count * scale))
+            for color, count in histogram.items()
+        )
+        sample = Image.frombytes("RGB", (len(data) // 3, 1), data)
+        sample = trim_palette(QUANTIZERS[quantizer].quantize(sample, colors))
+        palette = bytes(sample.getpalette())
+    if transparent:
+        return bytes(3) + palette, 0
+    return palette, None
+
+
+def load_palette(path):
+    with open(path, "rb") as fh:
+        if fh.read(4) == XYZ_MAGIC:
+            fh.seek(0)
+            return bytes(trim_palette(decode_xyz(fh.read())).getpalette()), None
+    with Image.open(path) as img:
+        if img.mode != "P":
+            raise ValueError(
+                f"{os.path.basename(path)} is not an indexed PNG or XYZ image"
+            )
+        return bytes(trim_palette(img).getpalette()), transparent_index(img)
+
+
+def save_palette(palette, path, transparency=None):
+    colors = len(palette) // 3
+    width = min(colors, 16)
+    height = -(-colors // width)
+    img = Image.frombytes(
+        "P", (width, height), bytes(range(colors)).ljust(width * height, b"\0")
+    )
+    img.putpalette(palette)
+    params = {} if transparency is None else {"transparency": transparency}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    img.save(path, **params)
+
+
+class PaletteRemapper:
+    def __init__(self, palette, transparency=None):
+        self.palette = bytes(palette[:768])
+        self.transparency = transparency
+        self.colors = [
+            tuple(self.palette[i : i + 3]) for i in range(0, len(self.palette), 3)
+        ]
+        keys = array.array(
+            "I",
+            Image.frombytes("RGB", (len(self.colors), 1), self.palette).tobytes(
+                "raw", "RGBX"
+            ),
+        )
+        self.color_to_index = {}
+        for index, key in enumerate(keys):
+            if index != transparency:
+                self.color_to_index.setdefault(key, index)
+        self.cube = {}
+
+    def candidates(self, r, g, b):
+        cell = (
+            r >> PALETTE_CUBE_SHIFT,
+            g >> PALETTE_CUBE_SHIFT,
+            b >> PALETTE_CUBE_SHIFT,
+        )
+        found = self.cube.get(cell)
+        if found is None:
+            half = 1 << PALETTE_CUBE_SHIFT >> 1
+            cr, cg, cb = ((c << PALETTE_CUBE_SHIFT) + half for c in cell)
+            distances = [
+                (pr - cr) ** 2 + (pg - cg) ** 2 + (pb - cb) ** 2
+                for pr, pg, pb in self.colors
+            ]
+            if self.transparency is not None and self.transparency < len(distances):
+                distances[self.transparency] = math.inf
+            limit = (math.sqrt(min(distances)) + 2 * PALETTE_CELL_RADIUS) ** 2
+            found = [index for index, d in enumerate(distances) if d <= limit]
+            self.cube[cell] = found
+        return found
+
+    def index_of(self, key):
+        index = self.color_to_index.get(key)
+        if index is None:
+            r, g, b = key.to_bytes(4, sys.byteorder)[:3]
+            colors = self.colors
+            index = min(
+                self.candidates(r, g, b),
+                key=lambda i: (colors[i][0] - r) ** 2
+                + (colors[i][1] - g) ** 2
+                + (colors[i][2] - b) ** 2,
+            )
+            self.color_to_index[key] = index
+        return index
+
+    def pixel_index(self, key):
+        r, g, b, a = key.to_bytes(4, sys.byteorder)
+        if a == 0:
+            return self.transparency
+        if a != 255:
+            key = int.from_bytes(bytes((r, g, b, 255)), sys.byteorder)
+        return self.index_of(key)
+
+    def remap(self, img):
+        if self.transparency is not None and has_alpha(img):
+            mode, raw_mode = "RGBA", "RGBA"
+        else:
+            mode, raw_mode = "RGB", "RGBX"
+        if img.mode != mode:
+            img = img.convert(mode)
+        pixels = array.array("I", img.tobytes("raw", raw_mode))
+        color_to_index = {key: self.pixel_index(key) for key in set(pixels)}
+        output_image = Image.frombytes(
+            "P", img.size, bytes(map(color_to_index.__getitem__, pixels))
+        )
+        output_image.putpalette(self.palette)
+        if self.transparency is not None:
+            output_image.info["transparency"] = self.transparency
+        return output_image
+
+
+@functools.lru_cache(maxsize=4)
+def palette_remapper(palette_file, palette_hash):
+    return PaletteRemapper(*load_palette(palette_file))
+
+
+def convert_png_to_xyz(input_path, output_path, encoder=None, stats=NULL_STATS):
+    try:
+        with open_input(input_path) as input_fh, open_image(
+            input_fh, input_path
+        ) as img:
+            if stats.enabled:
+                stats.count("bytes_in", source_stat(input_path)[0])
+            img.load()
+            stats.mark("read")
+            data = encode_xyz(img, encoder, stats, cancel_event)
+        make_output_dir(output_path)
+        stats.mark("makedirs")
+        with open_output(output_path) as f:
+            f.write(data)
+        stats.count("bytes_out", len(data))
+        stats.mark("save")
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+def convert_to_8bit(
+    input_path,
+    output_path,
+    quantizer=DEFAULT_QUANTIZER,
+    palette_file=None,
+    palette_hash=None,
+    encoder=None,
+    stats=NULL_STATS,
+):
+    try:
+        settings = EncoderSettings(**(encoder or {}))
+        if quantizer not in QUANTIZERS:
+            return False, f"Unknown quantizer: {quantizer}"
+        with open_input(input_path) as input_fh:
+            img = open_image(input_fh, input_path)
+            if stats.enabled:
+                stats.count("bytes_in", source_stat(input_path)[0])
+            img.load()
+        stats.count("pixels", img.width * img.height)
+        stats.mark("read")
+        if palette_file:
+            img = palette_remapper(palette_file, palette_hash).remap(img)
+        elif img.mode == "P":
+            img = trim_palette(img)
+        else:
+            img = QUANTIZERS[quantizer].quantize(img)
+        stats.mark("palette")
+        check_cancelled(cancel_event)
+        make_output_dir(output_path)
+        stats.mark("makedirs")
+        with open_output(output_path) as output_fh:
+            img.save(output_fh, format="PNG", **settings.png_params())
+        stats.mark("save")
+        if stats.enabled:
+            stats.count("bytes_out", output_size(output_path))
+        return True, None
+    except Exception as e:
+        return False, str(e)
+
+
+CONVERTERS = {
+    "xyz2png": convert_xyz_to_png,
+    "png2xyz": convert_png_to_xyz,
+    "to256colors": convert_to_8bit,
+}
+
+
+def convert_file(
+    conversion_type, input_path, output_path, options, profile=False, in_memory=False
+):
+    if is_cancelled():
+        return False, CANCELLED_MESSAGE, None, None
+    stats = ConversionStats() if profile else NULL_STATS
+    output = io.BytesIO() if in_memory else output_path
+    success, message = CONVERTERS[conversion_type](
+        input_path, output, stats=stats, **options
+    )
+    data = output.getvalue() if in_memory and success else None
+    if not profile:
+        return success, message, None, data
+    stats.finish()
+    return success, message, stats, data
+
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JOB_MEMORY_OVERHEAD = 2 * 1024 * 1024
+
+
+class ImageInfo:
+    def __init__(
+        self, size=0, format=None, width=0, height=0, indexed=False, error=None
+    ):
+        self.size = size
+        self.format = format
+        self.width = width
+        self.height = height
+        self.indexed = indexed
+        self.error = error
+
+    @property
+    def pixels(self):
+        return 0 if self.error else self.width * self.height
+
+
+def inspect_image(input_path):
+    try:
+        size = source_stat(input_path)[0]
+        if isinstance(input_path, ArchiveMember):
+            with open_archive(input_path.archive_path).open(input_path.name) as fh:
+                header = fh.read(26)
+        else:
+            with open(input_path, "rb") as fh:
+                header = fh.read(26)
+    except (OSError, KeyError, zipfile.BadZipFile) as e:
+        return ImageInfo(error=str(e))
+    if header[:4] == b"XYZ1":
+        if len(header) < 8:
+            return ImageInfo(size, "XYZ", error="Truncated header")
+        width, height = struct.unpack("=HH", header[4:8])
+        error = check_xyz_size(width, height, size - 8)
+        return ImageInfo(size, "XYZ", width, height, True, error)
+    if header[:8] == PNG_SIGNATURE:
+        if len(header) < 26 or header[12:16] != b"IHDR":
+            return ImageInfo(size, "PNG", error="Truncated header")
+        width, height = struct.unpack(">II", header[16:24])
+        error = None if width and height else f"Invalid size ({width}x{height})"
+        return ImageInfo(size, "PNG", width, height, header[25] == 3, error)
+    return ImageInfo(size, error=f"Unsupported file format: {header[:4]}")
+
+
+def estimate_job_memory(conversion_type, options, info):
+    if info.error or not info.pixels:
+        return JOB_MEMORY_OVERHEAD
+    if conversion_type == "xyz2png":
+        memory_per_pixel = 6 if options.get("png_mode") == "RGBA" else 2
+    elif info.indexed:
+        memory_per_pixel = 4
+    elif conversion_type == "png2xyz":
+        memory_per_pixel = 22
+    elif options.get("palette_file"):
+        memory_per_pixel = 16
+    else:
+        memory_per_pixel = QUANTIZERS[options["quantizer"]].memory_per_pixel
+    return JOB_MEMORY_OVERHEAD + info.pixels * memory_per_pixel
+
+
+def default_memory_budget():
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def scan_files(folder_path, extension):
+    directories = [(folder_path, "")]
+    while directories:
+        directory, relative_dir = directories.pop()
+        subdirectories = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    relative_path = os.path.join(relative_dir, entry.name)
+                    if is_dir:
+                        if not entry.is_symlink():
+                            subdirectories.append((entry.path, relative_path))
+                    elif entry.name.lower().endswith(extension):
+                        yield entry.path, relative_path
+        except OSError:
+            continue
+        directories.extend(reversed(subdirectories))
+
+
+WINDOWS_RESERVED_CHARACTERS = str.maketrans(':<>|"?*', "_______")
+
+
+def archive_member_path(filename):
+    path = filename.replace("/", os.path.sep)
+    if os.path.altsep:
+        path = path.replace(os.path.altsep, os.path.sep)
+    path = os.path.splitdrive(path)[1]
+    parts = []
+    for part in path.split(os.path.sep):
+        if os.path.sep == "\\":
+            part = part.translate(WINDOWS_RESERVED_CHARACTERS).rstrip(". ")
+        if part not in ("", os.path.curdir, os.path.pardir):
+            parts.append(part)
+    return os.path.sep.join(parts)
+
+
+def scan_archive(archive_path, extension):
+    with zipfile.ZipFile(archive_path) as archive:
+        infos = archive.infolist()
+    for info in infos:
+        if info.is_dir() or not info.filename.lower().endswith(extension):
+            continue
+        relative_path = archive_member_path(info.filename)
+        if relative_path:
+            yield ArchiveMember(archive_path, info), relative_path
+
+
+def is_archive(path):
+    return is_archive_path(path) and zipfile.is_zipfile(path)
+
+
+WATCH_DEBOUNCE = 0.25
+WATCH_POLL_INTERVAL = 0.5
+INOTIFY_MASK = 0x2 | 0x8 | 0x80 | 0x100
+INOTIFY_Q_OVERFLOW = 0x4000
+INOTIFY_IGNORED = 0x8000
+INOTIFY_ISDIR = 0x40000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    def __init__(self, folder_paths, extension, interval=WATCH_POLL_INTERVAL):
+        self.folder_paths = folder_paths
+        self.extension = extension
+        self.interval = interval
+        self.snapshot = self.scan()
+        self.next_poll = time.monotonic() + interval
+
+    def scan(self):
+        snapshot = {}
+        for folder_path in self.folder_paths:
+            for path, _ in scan_files(folder_path, self.extension):
+                try:
+                    snapshot[path] = source_stat(path)
+                except OSError:
+                    pass
+        return snapshot
+
+    def changes(self, timeout):
+        delay = self.next_poll - time.monotonic()
+        if delay > timeout:
+            time.sleep(timeout)
+            return set()
+        time.sleep(max(delay, 0))
+        self.next_poll = time.monotonic() + self.interval
+        snapshot = self.scan()
+        changed = {
+            path for path, stat in snapshot.items() if self.snapshot.get(path) != stat
+        }
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    def __init__(self, folder_paths, extension):
+        self.folder_paths = folder_paths
+        self.extension = extension
+        self.directories = {}
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        try:
+            for folder_path in folder_paths:
+                self.add_tree(folder_path)
+        except OSError:
+            self.close()
+            raise
+
+    def add_tree(self, folder_path):
+        directories = [folder_path]
+        while directories:
+            directory = directories.pop()
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), INOTIFY_MASK
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                raise OSError(errno, os.strerror(errno), directory)
+            self.directories[wd] = directory
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(entry.path)
+            except OSError:
+                continue
+
+    def changes(self, timeout):
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & INOTIFY_Q_OVERFLOW:
+                for folder_path in self.folder_paths:
+                    changed.update(
+                        path for path, _ in scan_files(folder_path, self.extension)
+                    )
+                continue
+            if mask & INOTIFY_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & INOTIFY_ISDIR:
+                try:
+                    self.add_tree(path)
+                except OSError:
+                    pass
+                changed.update(path for path, _ in scan_files(path, self.extension))
+            elif name.lower().endswith(self.extension):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def open_watcher(folder_paths, extension, polling=False):
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folder_paths, extension)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(folder_paths, extension)
+
+
+class JobDiscovery(threading.Thread):
+    def __init__(
+        self, jobs, accept=None, estimate=None, cancel_event=None, dedup=False
+    ):
+        super().__init__(daemon=True)
+        self.jobs = jobs
+        self.accept = accept
+        self.estimate = estimate
+        self.cancel_event = cancel_event
+        self.dedup = dedup
+        self.queue = queue.Queue()
+        self.sizes = {}
+        self.digests = {}
+        self.duplicates = []
+        self.outputs = {}
+        self.conflicts = []
+        self.skipped = []
+        self.condition = threading.Condition()
+        self.found = 0
+        self.total_bytes = 0
+        self.total_pixels = 0
+        self.done = False
+        self.error = None
+
+    def run(self):
+        try:
+            for job in self.jobs:
+                if self.cancel_event and self.cancel_event.is_set():
+                    break
+                output_key = os.path.normcase(os.path.abspath(job[1]))
+                first = self.outputs.setdefault(output_key, job)
+                if first is not job:
+                    with self.condition:
+                        self.conflicts.append((self.found, job, first))
+                        self.skipped.append(self.found)
+                        self.found += 1
+                        self.condition.notify_all()
+                    continue
+                if self.accept and not self.accept(job):
+                    continue
+                info = inspect_image(job[0])
+                index = self.found
+                source_index = None
+                if self.dedup and not info.error:
+                    source_index = self.duplicate_of(index, job, info)
+                memory = self.estimate(info) if self.estimate else 0
+                with self.condition:
+                    self.found += 1
+                    if source_index is not None:
+                        self.duplicates.append((index, job, info, source_index))
+                        self.skipped.append(index)
+                        self.condition.notify_all()
+                        continue
+                    self.total_bytes += info.size
+                    self.total_pixels += info.pixels
+                    self.condition.notify_all()
+                self.queue.put((index, job, info, memory))
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.done = True
+                self.condition.notify_all()
+            self.queue.put(None)
+
+    def duplicate_of(self, index, job, info):
+        if info.size not in self.sizes:
+            self.sizes[info.size] = index, job
+            return None
+        first = self.sizes[info.size]
+        if first:
+            self.sizes[info.size] = None
+            digest = job_digest(first[1])
+            if digest:
+                self.digests.setdefault(digest, first[0])
+        digest = job_digest(job)
+        if not digest:
+            return None
+        if digest in self.digests:
+            return self.digests[digest]
+        self.digests[digest] = index
+        return None
+
+    def wait_for(self, count):
+        with self.condition:
+            self.condition.wait_for(lambda: self.done or self.found >= count)
+
+
+PIPELINE_READERS = 2
+PIPELINE_CONVERTERS = 1
+PIPELINE_WRITERS = 2
+PIPELINE_QUEUE_SIZE = 2
+
+
+class PipelineStage:
+    def __init__(self, name, function, threads, input_queue, output_queue):
+        self.name = name
+        self.function = function
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.threads = [
+            threading.Thread(target=self.run, daemon=True) for _ in range(threads)
+        ]
+        self.running = threads
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy_time = 0.0
+        self.wait_time = 0.0
+        self.blocked_time = 0.0
+        self.max_depth = 0
+        self.total_depth = 0
+
+    def start(self):
+        for thread in self.threads:
+            thread.start()
+
+    def run(self):
+        while True:
+            start_time = time.perf_counter()
+            depth = self.input_queue.qsize()
+            item = self.input_queue.get()
+            if item is None:
+                self.input_queue.put(None)
+                break
+            work_time = time.perf_counter()
+            result = self.function(*item)
+            put_time = time.perf_counter()
+            self.output_queue.put(result)
+            with self.lock:
+                self.items += 1
+                self.wait_time += work_time - start_time
+                self.busy_time += put_time - work_time
+                self.blocked_time += time.perf_counter() - put_time
+                self.max_depth = max(self.max_depth, depth)
+                self.total_depth += depth
+        with self.lock:
+            self.running -= 1
+            if not self.running:
+                self.output_queue.put(None)
+
+    def metrics(self):
+        return {
+            "stage": self.name,
+            "threads": len(self.threads),
+            "items": self.items,
+            "busy_time": self.busy_time,
+            "wait_time": self.wait_time,
+            "blocked_time": self.blocked_time,
+            "max_depth": self.max_depth,
+            "mean_depth": self.total_depth / self.items if self.items else 0.0,
+        }
+
+
+def iter_pipeline_results(
+    conversion_type,
+    discovery,
+    options,
+    profile=False,
+    in_memory=False,
+    cancel_event=None,
+    pipeline_metrics=None,
+):
+    stop_event = threading.Event()
+    cancelled = False, CANCELLED_MESSAGE, None, None
+
+    def read(index, job, info, memory):
+        if stop_event.is_set() or is_cancelled():
+            return index, job, info, None, cancelled
+        try:
+            return index, job, info, prefetch_input(job[0]), None
+        except Exception as e:
+            return index, job, info, None, (False, str(e), None, None)
+
+    def convert(index, job, info, source, result):
+        if result is None:
+            if stop_event.is_set():
+                result = cancelled
+            else:
+                result = convert_file(
+                    conversion_type, source, job[1], options, profile, True
+                )
+        return index, job, info, result
+
+    def write(index, job, info, result):
+        success, message, stats, data = result
+        if not success or in_memory:
+            return index, job, info, result
+        try:
+            make_output_dir(job[1])
+            with open_output(job[1]) as fh:
+                fh.write(data)
+        except Exception as e:
+            return index, job, info, (False, str(e), stats, None)
+        return index, job, info, (success, message, stats, None)
+
+    read_queue = queue.Queue(PIPELINE_QUEUE_SIZE)
+    convert_queue = queue.Queue(PIPELINE_QUEUE_SIZE)
+    result_queue = queue.Queue(PIPELINE_QUEUE_SIZE)
+    stages = [
+        PipelineStage("read", read, PIPELINE_READERS, discovery.queue, read_queue),
+        PipelineStage(
+            "convert", convert, PIPELINE_CONVERTERS, read_queue, convert_queue
+        ),
+        PipelineStage("write", write, PIPELINE_WRITERS, convert_queue, result_queue),
+    ]
+    set_cancel_event(cancel_event)
+    for stage in stages:
+        stage.start()
+    finished = False
+    try:
+        while True:
+            item = result_queue.get()
+            if item is None:
+                finished = True
+                break
+            yield item
+    finally:
+        stop_event.set()
+        while not finished:
+            finished = result_queue.get() is None
+        set_cancel_event(None)
+        if pipeline_metrics is not None:
+            pipeline_metrics.extend(stage.metrics() for stage in stages)
+    if discovery.error:
+        raise discovery.error
+
+
+def iter_job_results(
+    conversion_type,
+    discovery,
+    workers=None,
+    options=None,
+    profile=False,
+    in_memory=False,
+    memory_budget=None,
+    cancel_event=None,
+    pipeline_metrics=None,
+):
+    options = options or {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1:
+        discovery.wait_for(2)
+        if discovery.found < 2:
+            workers = 1
+    if workers <= 1:
+        yield from iter_pipeline_results(
+            conversion_type,
+            discovery,
+            options,
+            profile,
+            in_memory,
+            cancel_event,
+            pipeline_metrics,
+        )
+        return
+    waiting = []
+    futures = {}
+    in_flight_memory = 0
+    discovering = True
+    context = multiprocessing.get_context("spawn")
+    worker_cancel_event = context.Event()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=init_worker,
+        initargs=(worker_cancel_event,),
+    ) as executor:
+        while discovering or waiting or futures:
+            if cancel_event and cancel_event.is_set():
+                worker_cancel_event.set()
+                discovering = False
+                waiting.clear()
+            while discovering:
+                try:
+                    item = discovery.queue.get(block=not waiting and not futures)
+                except queue.Empty:
+                    break
+                if item is None:
+                    if discovery.error:
+                        raise discovery.error
+                    discovering = False
+                    break
+                index, job, info, memory = item
+                cost = memory if memory_budget else info.size
+                if in_memory:
+                    waiting.append((cost, index, job, info, memory))
+                else:
+                    bisect.insort(waiting, (cost, index, job, info, memory))
+            while waiting and len(futures) < workers * 2:
+                position = len(waiting)
+                if in_memory:
+                    if (
+                        memory_budget
+                        and futures
+                        and waiting[0][0] > memory_budget - in_flight_memory
+                    ):
+                        break
+                    position = 1
+                elif memory_budget and futures:
+                    position = bisect.bisect_right(
+                        waiting, (memory_budget - in_flight_memory, math.inf)
+                    )
+                    if not position:
+                        break
+                _, index, job, info, memory = waiting.pop(position - 1)
+                in_flight_memory += memory
+                future = executor.submit(
+                    convert_file,
+                    conversion_type,
+                    job[0],
+                    job[1],
+                    options,
+                    profile,
+                    in_memory,
+                )
+                futures[future] = index, job, info, memory
+            if not futures:
+                continue
+            done, _ = wait(futures, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, job, info, memory = futures.pop(future)
+                in_flight_memory -= memory
+                yield index, job, info, future.result()
+
+
+REPORT_FILENAME = "rpgmic-report.txt"
+REPORT_SLOWEST_FILES = 10
+
+
+class RunReport:
+    def __init__(self, conversion_type, slowest_files=REPORT_SLOWEST_FILES):
+        self.conversion_type = conversion_type
+        self.slowest_files = slowest_files
+        self.stages = {}
+        self.counters = {}
+        self.file_times = []
+        self.pipeline = []
+        self.start_time = time.perf_counter()
+        self.wall_time = 0.0
+
+    def add(self, label, stats):
+        for stage, seconds in stats.stages.items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        for counter, value in stats.counters.items():
+            self.counters[counter] = self.counters.get(counter, 0) + value
+        self.file_times.append((stats.total_time, label))
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self.start_time
+
+    def format(self):
+        lines = [
+            f"Conversion report ({self.conversion_type}): "
+            f"{len(self.file_times)} files in {self.wall_time:.2f} s"
+        ]
+        stage_total = sum(self.stages.values())
+        if self.stages:
+            lines.append("")
+            lines.append("Time per stage (summed over all files):")
+            for stage, seconds in sorted(
+                self.stages.items(), key=lambda item: item[1], reverse=True
+            ):
+                share = seconds / stage_total * 100 if stage_total else 0.0
+                lines.append(f"  {stage:<12} {seconds:10.3f} s  {share:5.1f}%")
+        if self.counters:
+            lines.append("")
+            lines.append("Counters:")
+            for counter, value in sorted(self.counters.items()):
+                lines.append(f"  {counter:<14} {value:,}")
+        if self.pipeline:
+            lines.append("")
+            lines.append(
+                "Pipeline stages (waiting: input queue empty, "
+                "blocked: output queue full):"
+            )
+            for metrics in self.pipeline:
+                lines.append(
+                    f"  {metrics['stage']:<8} {metrics['threads']} threads  "
+                    f"busy {metrics['busy_time']:8.3f} s  "
+                    f"waiting {metrics['wait_time']:8.3f} s  "
+                    f"blocked {metrics['blocked_time']:8.3f} s  "
+                    f"queue depth max {metrics['max_depth']} "
+                    f"mean {metrics['mean_depth']:.1f}"
+                )
+        if self.file_times:
+            lines.append("")
+            lines.append(f"Slowest {self.slowest_files} files:")
+            for seconds, label in sorted(self.file_times, reverse=True)[
+                : self.slowest_files
+            ]:
+                lines.append(f"  {seconds:8.3f} s  {label}")
+        return "\n".join(lines)
+
+    def write(self, output_root):
+        os.makedirs(output_root, exist_ok=True)
+        with open(
+            os.path.join(output_root, REPORT_FILENAME), "w", encoding="utf-8"
+        ) as f:
+            f.write(self.format() + "\n")
+
+
+INVENTORY_EXTENSIONS = (".xyz", ".png")
+INVENTORY_TOP_SIZES = 10
+
+
+def iter_sources(input_paths, extension=INVENTORY_EXTENSIONS):
+    for input_path in input_paths:
+        if os.path.isdir(input_path):
+            folder_name = os.path.basename(os.path.normpath(input_path))
+            for full_path, relative_path in scan_files(input_path, extension):
+                yield full_path, os.path.join(folder_name, relative_path)
+        elif is_archive(input_path):
+            archive_name = os.path.basename(input_path)
+            for member, relative_path in scan_archive(input_path, extension):
+                yield member, os.path.join(archive_name, relative_path)
+        else:
+            yield input_path, os.path.basename(input_path)
+
+
+class Inventory:
+    def __init__(self, top_sizes=INVENTORY_TOP_SIZES):
+        self.top_sizes = top_sizes
+        self.entries = []
+
+    def scan(self, input_paths, extension=INVENTORY_EXTENSIONS):
+        for source, label in iter_sources(input_paths, extension):
+            self.add(label, inspect_image(source))
+        return self
+
+    def add(self, label, info):
+        self.entries.append((label, info))
+
+    @property
+    def invalid(self):
+        return [(label, info) for label, info in self.entries if info.error]
+
+    def summary(self):
+        formats = {}
+        for _, info in self.entries:
+            totals = formats.setdefault(
+                info.format or "unknown", {"files": 0, "bytes": 0, "pixels": 0}
+            )
+            totals["files"] += 1
+            totals["bytes"] += info.size
+            totals["pixels"] += info.pixels
+        sizes = collections.Counter(
+            f"{info.width}x{info.height}" for _, info in self.entries if not info.error
+        )
+        largest = heapq.nlargest(
+            self.top_sizes,
+            ((label, info) for label, info in self.entries if not info.error),
+            key=lambda entry: entry[1].pixels,
+        )
+        return {
+            "files": len(self.entries),
+            "bytes": sum(info.size for _, info in self.entries),
+            "pixels": sum(info.pixels for _, info in self.entries),
+            "invalid": len(self.invalid),
+            "formats": formats,
+            "sizes": dict(sizes.most_common(self.top_sizes)),
+            "largest": [
+                {
+                    "file": label.replace(os.sep, "/"),
+                    "width": info.width,
+                    "height": info.height,
+                    "pixels": info.pixels,
+                }
+                for label, info in largest
+            ],
+        }
+
+    def format(self):
+        summary = self.summary()
+        lines = [
+            f"Inventory: {summary['files']} files, "
+            f"{summary['bytes'] / (1024 * 1024):.1f} MB, "
+            f"{summary['pixels'] / 1e6:.1f} megapixels"
+        ]
+        if summary["formats"]:
+            lines.append("")
+            lines.append("By format:")
+            for name, totals in sorted(summary["formats"].items()):
+                lines.append(
+                    f"  {name:<8} {totals['files']:6} files "
+                    f"{totals['bytes'] / (1024 * 1024):10.1f} MB "
+                    f"{totals['pixels'] / 1e6:10.1f} Mpx"
+                )
+        if summary["sizes"]:
+            lines.append("")
+            lines.append(f"Most common dimensions (top {self.top_sizes}):")
+            for size, count in summary["sizes"].items():
+                lines.append(f"  {size:<12} {count:6} files")
+        if summary["largest"]:
+            lines.append("")
+            lines.append(f"Largest images (top {self.top_sizes}):")
+            for entry in summary["largest"]:
+                size = f"{entry['width']}x{entry['height']}"
+                lines.append(f"  {size:<12} {entry['file']}")
+        invalid = self.invalid
+        if invalid:
+            lines.append("")
+            lines.append(f"Invalid files ({len(invalid)}):")
+            for label, info in invalid:
+                lines.append(f"  {label}: {info.error}")
+        return "\n".join(lines)
+
+    def rows(self):
+        for label, info in self.entries:
+            yield {
+                "file": label.replace(os.sep, "/"),
+                "format": info.format,
+                "bytes": info.size,
+                "width": info.width,
+                "height": info.height,
+                "indexed": info.indexed,
+                "error": info.error,
+            }
+
+    def write(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        extension = os.path.splitext(path)[1].lower()
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            if extension == ".json":
+                json.dump(
+                    {"summary": self.summary(), "files": list(self.rows())},
+                    f,
+                    indent=2,
+                )
+                f.write("\n")
+            elif extension == ".csv":
+                writer = csv.DictWriter(
+                    f,
+                    ["file", "format", "bytes", "width", "height", "indexed", "error"],
+                )
+                writer.writeheader()
+                writer.writerows(self.rows())
+            else:
+                f.write(self.format() + "\n")
+
+
+PROGRESS_INTERVAL = 0.1
+
+
+class ProgressReporter:
+    def __init__(self, callback, interval=PROGRESS_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.start_time = time.time()
+        self.last_report = None
+        self.pending = None
+
+    def update(
+        self,
+        processed_files,
+        total_files,
+        processed_bytes,
+        processed_work=0,
+        total_work=None,
+    ):
+        if not self.callback:
+            return
+        now = time.time()
+        elapsed_time = now - self.start_time
+        if total_work and processed_work > 0:
+            time_per_unit = elapsed_time / processed_work
+            remaining_time = time_per_unit * (total_work - processed_work)
+        elif processed_files > 0:
+            time_per_file = elapsed_time / processed_files
+            remaining_files = total_files - processed_files
+            remaining_time = time_per_file * remaining_files
+        else:
+            remaining_time = 0
+        if elapsed_time > 0:
+            files_per_second = processed_files / elapsed_time
+            bytes_per_second = processed_bytes / elapsed_time
+        else:
+            files_per_second = bytes_per_second = 0.0
+        if total_work:
+            progress = processed_work / total_work
+        else:
+            progress = processed_files / total_files if total_files else 1.0
+        self.pending = (
+            processed_files,
+            total_files,
+            progress,
+            remaining_time,
+            files_per_second,
+            bytes_per_second,
+        )
+        if self.last_report is None or now - self.last_report >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.callback(*self.pending)
+            self.pending = None
+            self.last_report = time.time()
+
+
+def format_progress(
+    current, total, progress, remaining_time, files_per_second, bytes_per_second
+):
+    mins, secs = divmod(int(remaining_time), 60)
+    time_estimate = f"{mins:02d}:{secs:02d}" if remaining_time > 0 else "--:--"
+    return (
+        f"Processed {current}/{total} files - "
+        f"{files_per_second:.1f} files/s, "
+        f"{bytes_per_second / (1024 * 1024):.1f} MB/s - ETA: {time_estimate}"
+    )
+
+
+DEFAULT_OPTIONS = {
+    "xyz2png": {"png_mode": "P"},
+    "png2xyz": {},
+    "to256colors": {"quantizer": DEFAULT_QUANTIZER},
+}
+
+EXTENSIONS = {
+    "xyz2png": (".xyz", ".png"),
+    "png2xyz": (".png", ".xyz"),
+    "to256colors": (".png", None),
+}
+
+DEFAULT_OUTPUT_FOLDERS = {
+    "xyz2png": "XYZ2PNG_Output",
+    "png2xyz": "PNG2XYZ_Output",
+    "to256colors": "256COLORS_Output",
+}
+
+
+def default_output_dir(conversion_type):
+    return os.path.join(
+        os.path.expanduser("~"), "Downloads", DEFAULT_OUTPUT_FOLDERS[conversion_type]
+    )
+
+
+MANIFEST_FILENAME = ".rpgmic-manifest.json"
+MANIFEST_VERSION = 1
+JOURNAL_FILENAME = ".rpgmic-journal.jsonl"
+
+
+def file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_digest(input_path):
+    if isinstance(input_path, ArchiveMember):
+        return f"crc32:{input_path.crc:08x}"
+    return file_digest(input_path)
+
+
+def content_digest(input_path):
+    if isinstance(input_path, ArchiveMember):
+        return hashlib.blake2b(input_path.read(), digest_size=16).hexdigest()
+    return file_digest(input_path)
+
+
+def job_digest(job):
+    try:
+        return content_digest(job[0])
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+class OrderedWriter:
+    def __init__(self, write, skipped):
+        self.write = write
+        self.skipped_indices = skipped
+        self.seen_skipped = 0
+        self.skipped = set()
+        self.held = {}
+        self.next_index = 0
+
+    def add(self, index, job, data):
+        self.held[index] = job, data
+        while True:
+            if self.next_index in self.held:
+                job, data = self.held.pop(self.next_index)
+                if data is not None:
+                    self.write(job, data)
+            else:
+                skipped = self.skipped_indices[self.seen_skipped :]
+                self.seen_skipped += len(skipped)
+                self.skipped.update(skipped)
+                if self.next_index not in self.skipped:
+                    break
+                self.skipped.discard(self.next_index)
+            self.next_index += 1
+
+    def flush(self):
+        for index in sorted(self.held):
+            job, data = self.held.pop(index)
+            if data is not None:
+                self.write(job, data)
+
+
+class BuildManifest:
+    def __init__(self, output_root):
+        self.output_root = output_root
+        self.path = os.path.join(output_root, MANIFEST_FILENAME)
+        self.journal_path = os.path.join(output_root, JOURNAL_FILENAME)
+        self.journal = None
+        self.entries = {}
+        self.pending = {}
+        self.changed = False
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            if data.get("version") == MANIFEST_VERSION:
+                self.entries = data["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+        self.replay_journal()
+
+    def replay_journal(self):
+        try:
+            with open(self.journal_path, encoding="utf-8") as fh:
+                lines = fh.readlines()
+        except OSError:
+            return
+        for line in lines:
+            try:
+                key, entry = json.loads(line)
+            except (ValueError, TypeError):
+                continue
+            if entry is None:
+                self.entries.pop(key, None)
+            else:
+                self.entries[key] = entry
+            self.changed = True
+
+    def key(self, output_path):
+        return os.path.relpath(output_path, self.output_root).replace(os.sep, "/")
+
+    def check(self, job, conversion_type, options, force=False):
+        input_path, output_path, _ = job
+        key = self.key(output_path)
+        try:
+            size, mtime_ns = source_stat(input_path)
+        except OSError:
+            return False
+        record = {
+            "input": os.path.abspath(str(input_path)),
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "conversion_type": conversion_type,
+            "options": options,
+        }
+        self.pending[key] = record, input_path
+        entry = self.entries.get(key)
+        if force or not entry or not os.path.exists(output_path):
+            return False
+        for field in ("input", "size", "conversion_type", "options"):
+            if entry.get(field) != record[field]:
+                return False
+        if entry.get("mtime_ns") == record["mtime_ns"]:
+            return True
+        try:
+            record["hash"] = source_digest(input_path)
+        except OSError:
+            return False
+        if entry.get("hash") != record["hash"]:
+            return False
+        entry["mtime_ns"] = record["mtime_ns"]
+        self.changed = True
+        return True
+
+    def record(self, output_path, success):
+        key = self.key(output_path)
+        record, input_path = self.pending.pop(key, (None, None))
+        self.changed = True
+        if success and record is not None:
+            try:
+                if "hash" not in record:
+                    record["hash"] = source_digest(input_path)
+                unchanged = source_stat(input_path) == (
+                    record["size"],
+                    record["mtime_ns"],
+                )
+            except OSError:
+                unchanged = False
+            if unchanged:
+                self.entries[key] = record
+                self.append_journal(key, record)
+                return
+        self.entries.pop(key, None)
+        self.append_journal(key, None)
+
+    def append_journal(self, key, entry):
+        if self.journal is None:
+            os.makedirs(self.output_root, exist_ok=True)
+            self.journal = open(self.journal_path, "a", encoding="utf-8")
+        self.journal.write(json.dumps([key, entry]) + "\n")
+        self.journal.flush()
+
+    def save(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+        if not self.changed:
+            return
+        os.makedirs(self.output_root, exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as fh:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, fh)
+        os.replace(temp_path, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+
+def output_filename(filename, output_extension):
+    if output_extension:
+        return os.path.splitext(filename)[0] + output_extension
+    return filename
+
+
+class BatchConverter:
+    def __init__(
+        self,
+        conversion_type,
+        input_paths,
+        output_path,
+        workers=None,
+        progress_callback=None,
+        options=None,
+        force=False,
+        progress_interval=PROGRESS_INTERVAL,
+        profile=False,
+        shared_palette=None,
+        memory_budget=None,
+        dedup=DEFAULT_DEDUP,
+    ):
+        self.conversion_type = conversion_type
+        self.input_paths = input_paths
+        self.output_path = output_path
+        self.workers = workers
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+        self.options = dict(DEFAULT_OPTIONS[conversion_type], **(options or {}))
+        self.force = force
+        self.profile = profile
+        self.shared_palette = shared_palette
+        if memory_budget is None:
+            memory_budget = default_memory_budget()
+        self.memory_budget = memory_budget or None
+        if dedup and dedup not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode: {dedup}")
+        self.dedup = dedup
+        self.cancel_event = threading.Event()
+        self.palette_file = None
+        self.up_to_date_files = []
+        self.deduplicated_files = []
+        self.dedup_time_saved = 0.0
+        self.report = None
+        self.is_folder = isinstance(input_paths, str) and os.path.isdir(input_paths)
+        self.output_archive = is_archive_path(output_path)
+        if self.output_archive:
+            self.output_root = os.path.dirname(os.path.abspath(output_path))
+        else:
+            self.output_root = output_path
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        if self.is_folder:
+            jobs = self.folder_jobs(self.input_paths, self.output_path)
+        else:
+            input_paths = self.input_paths
+            if isinstance(input_paths, str):
+                input_paths = [input_paths]
+            jobs = self.iter_jobs(input_paths, self.output_path)
+        if self.shared_palette and self.conversion_type == "to256colors":
+            jobs = list(jobs)
+            self.prepare_palette(jobs)
+        return self.run_jobs(jobs)
+
+    def prepare_palette(self, jobs):
+        if self.shared_palette == SHARED_PALETTE_AUTO:
+            palette, transparency = build_shared_palette(
+                (job[0] for job in jobs), self.options["quantizer"]
+            )
+        else:
+            palette, transparency = load_palette(self.shared_palette)
+        if not palette:
+            return
+        self.palette_file = os.path.join(self.output_root, PALETTE_FILENAME)
+        save_palette(palette, self.palette_file, transparency)
+        self.options["palette_file"] = os.path.abspath(self.palette_file)
+        self.options["palette_hash"] = hashlib.blake2b(
+            palette + str(transparency).encode("ascii"), digest_size=16
+        ).hexdigest()
+
+    def iter_jobs(self, input_paths, output_root):
+        for input_path in input_paths:
+            if os.path.isdir(input_path):
+                yield from self.folder_jobs(input_path, output_root)
+            elif is_archive(input_path):
+                yield from self.archive_jobs(input_path, output_root)
+            else:
+                yield self.file_job(input_path, output_root)
+
+    def file_job(self, input_path, output_root):
+        filename = os.path.basename(input_path)
+        output_extension = EXTENSIONS[self.conversion_type][1]
+        output_path = os.path.join(
+            output_root, output_filename(filename, output_extension)
+        )
+        return input_path, output_path, filename
+
+    def folder_jobs(self, folder_path, output_root):
+        extension = EXTENSIONS[self.conversion_type][0]
+        for full_path, relative_path in scan_files(folder_path, extension):
+            yield self.folder_job(folder_path, full_path, relative_path, output_root)
+
+    def folder_job(self, folder_path, full_path, relative_path, output_root):
+        output_extension = EXTENSIONS[self.conversion_type][1]
+        parent_folder_name = os.path.basename(os.path.normpath(folder_path))
+        relative_dir, file = os.path.split(relative_path)
+        output_dir = os.path.join(output_root, parent_folder_name, relative_dir)
+        output_path = os.path.join(output_dir, output_filename(file, output_extension))
+        return full_path, output_path, relative_path
+
+    def archive_jobs(self, archive_path, output_root):
+        extension, output_extension = EXTENSIONS[self.conversion_type]
+        archive_name = os.path.splitext(os.path.basename(archive_path))[0]
+        for member, relative_path in scan_archive(archive_path, extension):
+            relative_dir, file = os.path.split(relative_path)
+            output_dir = os.path.join(output_root, archive_name, relative_dir)
+            output_path = os.path.join(
+                output_dir, output_filename(file, output_extension)
+            )
+            yield member, output_path, relative_path
+
+    def archive_name(self, output_path):
+        return os.path.relpath(output_path, self.output_path).replace(os.sep, "/")
+
+    def run_jobs(self, jobs):
+        if self.output_archive:
+            return self.run_archive_jobs(jobs)
+        manifest = BuildManifest(self.output_path)
+
+        def needs_conversion(job):
+            if manifest.check(job, self.conversion_type, self.options, self.force):
+                self.up_to_date_files.append(job[1])
+                return False
+            return True
+
+        def record(job, success):
+            manifest.record(job[1], success)
+
+        def copy_output(source_job, job):
+            link_output(source_job[1], job[1], self.dedup == "link")
+
+        try:
+            results = self.convert_jobs(
+                jobs, needs_conversion, record=record, copy=copy_output
+            )
+        finally:
+            manifest.save()
+        return self.finish_jobs(results)
+
+    def run_archive_jobs(self, jobs):
+        os.makedirs(self.output_root, exist_ok=True)
+        temp_path = self.output_path + ".tmp"
+        try:
+            with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED) as archive:
+
+                def write_member(job, data):
+                    archive.writestr(
+                        zipfile.ZipInfo(
+                            self.archive_name(job[1]), source_date_time(job[0])
+                        ),
+                        data,
+                    )
+
+                def copy_member(source_job, job):
+                    write_member(job, archive.read(self.archive_name(source_job[1])))
+
+                results = self.convert_jobs(jobs, write=write_member, copy=copy_member)
+            if self.cancelled:
+                results = []
+            else:
+                os.replace(temp_path, self.output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return self.finish_jobs(results)
+
+    def watch_folders(self):
+        input_paths = self.input_paths
+        if isinstance(input_paths, str):
+            input_paths = [input_paths]
+        folder_paths = [path for path in input_paths if os.path.isdir(path)]
+        if not folder_paths:
+            raise ValueError("Watch mode needs at least one input folder")
+        if self.output_archive:
+            raise ValueError("Watch mode cannot write to a zip archive")
+        return folder_paths
+
+    def watched_job(self, folder_paths, path):
+        folder_path = max(
+            (
+                folder_path
+                for folder_path in folder_paths
+                if path.startswith(os.path.join(folder_path, ""))
+            ),
+            key=len,
+        )
+        relative_path = os.path.relpath(path, folder_path)
+        return self.folder_job(folder_path, path, relative_path, self.output_path)
+
+    def watch(self, callback=None, polling=False, debounce=WATCH_DEBOUNCE):
+        folder_paths = self.watch_folders()
+        extension = EXTENSIONS[self.conversion_type][0]
+        output_root = os.path.join(os.path.abspath(self.output_root), "")
+        watcher = open_watcher(folder_paths, extension, polling)
+        pending = {}
+        try:
+            while not self.cancelled:
+                timeout = WATCH_POLL_INTERVAL
+                if pending:
+                    deadline = min(deadline for deadline, _ in pending.values())
+                    timeout = min(timeout, max(deadline - time.monotonic(), 0))
+                for path in watcher.changes(timeout):
+                    if os.path.abspath(path).startswith(output_root):
+                        continue
+                    try:
+                        stat = source_stat(path)
+                    except OSError:
+                        stat = None
+                    pending[path] = time.monotonic() + debounce, stat
+                jobs = []
+                now = time.monotonic()
+                for path, (deadline, stat) in list(pending.items()):
+                    if deadline > now:
+                        continue
+                    try:
+                        current = source_stat(path)
+                    except OSError:
+                        del pending[path]
+                        continue
+                    if current != stat:
+                        pending[path] = now + debounce, current
+                        continue
+                    del pending[path]
+                    jobs.append(self.watched_job(folder_paths, path))
+                if jobs:
+                    results = self.run_jobs(jobs)
+                    if callback:
+                        callback(*results)
+        finally:
+            watcher.close()
+
+    def estimate_memory(self, info):
+        return estimate_job_memory(self.conversion_type, self.options, info)
+
+    def convert_jobs(self, jobs, accept=None, write=None, record=None, copy=None):
+        workers = self.workers or os.cpu_count() or 1
+        estimate = None
+        if self.memory_budget and workers > 1:
+            estimate = self.estimate_memory
+        discovery = JobDiscovery(
+            jobs, accept, estimate, self.cancel_event, bool(self.dedup and copy)
+        )
+        discovery.start()
+        start_time = time.perf_counter()
+        first_result = None
+        results = {}
+        processed_files = 0
+        processed_bytes = 0
+        processed_work = 0
+        reporter = ProgressReporter(self.progress_callback, self.progress_interval)
+        self.report = RunReport(self.conversion_type) if self.profile else None
+        writer = OrderedWriter(write, discovery.skipped) if write else None
+        for index, job, info, result in iter_job_results(
+            self.conversion_type,
+            discovery,
+            self.workers,
+            self.options,
+            self.profile,
+            write is not None,
+            self.memory_budget,
+            self.cancel_event,
+            self.report.pipeline if self.report else None,
+        ):
+            success, message, stats, data = result
+            if not success and message == CANCELLED_MESSAGE:
+                continue
+            if writer:
+                writer.add(index, job, data if success else None)
+            if record:
+                record(job, success)
+            results[index] = job, success, message, stats
+            processed_files += 1
+            processed_bytes += info.size
+            processed_work += info.size + info.pixels
+            if first_result is None:
+                first_result = time.perf_counter(), processed_work
+            total_work = None
+            if discovery.done:
+                total_work = discovery.total_bytes + discovery.total_pixels
+            reporter.update(
+                processed_files,
+                discovery.found,
+                processed_bytes,
+                processed_work,
+                total_work,
+            )
+        if writer:
+            writer.flush()
+        for index, job, first in discovery.conflicts:
+            results[index] = (
+                job,
+                False,
+                f"Skipped, {str(first[0])!r} is converted to the same output file",
+                None,
+            )
+            processed_files += 1
+        convert_end = time.perf_counter()
+        self.deduplicated_files = []
+        self.dedup_time_saved = 0.0
+        dedup_start = time.perf_counter()
+        duplicate_work = 0
+        for index, job, info, source_index in discovery.duplicates:
+            if self.cancelled or source_index not in results:
+                continue
+            source_job, success, message, _ = results[source_index]
+            if success:
+                try:
+                    copy(source_job, job)
+                except Exception as e:
+                    success, message = False, str(e)
+            if record:
+                record(job, success)
+            results[index] = job, success, message, None
+            if success:
+                self.deduplicated_files.append(job[1])
+                duplicate_work += info.size + info.pixels
+            processed_files += 1
+            processed_bytes += info.size
+            reporter.update(
+                processed_files,
+                discovery.found,
+                processed_bytes,
+                processed_work,
+                discovery.total_bytes + discovery.total_pixels,
+            )
+        if duplicate_work and processed_work:
+            first_time, first_work = first_result
+            if processed_work > first_work:
+                seconds_per_work = (convert_end - first_time) / (
+                    processed_work - first_work
+                )
+            else:
+                seconds_per_work = (convert_end - start_time) / processed_work
+            self.dedup_time_saved = max(
+                seconds_per_work * duplicate_work - (time.perf_counter() - dedup_start),
+                0.0,
+            )
+        reporter.flush()
+        return [results[index] for index in sorted(results)]
+
+    def finish_jobs(self, results):
+        converted_files = []
+        error_messages = []
+        for (_, output_path, label), success, message, stats in results:
+            if self.report and stats:
+                self.report.add(label, stats)
+            if success:
+                converted_files.append(output_path)
+            else:
+                error_messages.append(f"Error in {label}: {message}")
+        if self.report:
+            self.report.finish()
+            self.report.write(self.output_root)
+        return converted_files, error_messages
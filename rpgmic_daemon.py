@@ -0,0 +1,476 @@
+﻿import os
+import json
+import math
+import time
+import hmac
+import base64
+import inspect
+import secrets
+import ipaddress
+import itertools
+import threading
+import http.client
+import multiprocessing
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor
+
+from rpgmic_core import (
+    CONVERTERS,
+    DEFAULT_OPTIONS,
+    PrefetchedInput,
+    convert_file,
+    init_worker,
+    make_output_dir,
+    open_output,
+    prefetch_input,
+)
+
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8750
+DAEMON_ADDRESS = f"http://{DAEMON_HOST}:{DAEMON_PORT}"
+MAX_REQUEST_BYTES = 512 * 1024 * 1024
+DAEMON_CHUNK_SIZE = 16
+CLIENT_BATCH_SIZE = 256
+TOKEN_HEADER = "X-Rpgmic-Token"
+TOKEN_ENV = "RPGMIC_DAEMON_TOKEN"
+TOKEN_DIR = os.path.join(os.path.expanduser("~"), ".rpgmic")
+CONVERTER_OPTIONS = {
+    conversion_type: frozenset(inspect.signature(converter).parameters)
+    - {"input_path", "output_path", "stats"}
+    for conversion_type, converter in CONVERTERS.items()
+}
+
+
+def token_path(port):
+    return os.path.join(TOKEN_DIR, f"daemon-{port}.token")
+
+
+def write_token(port):
+    token = secrets.token_urlsafe(32)
+    os.makedirs(TOKEN_DIR, mode=0o700, exist_ok=True)
+    path = token_path(port)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as fh:
+        fh.write(token)
+    return token
+
+
+def read_token(port):
+    token = os.environ.get(TOKEN_ENV)
+    if token:
+        return token
+    try:
+        with open(token_path(port), encoding="ascii") as fh:
+            return fh.read().strip()
+    except FileNotFoundError:
+        raise OSError(
+            f"No daemon token at {token_path(port)}, is 'rpgmic serve' running?"
+        ) from None
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(host.split("%", 1)[0]).is_loopback
+    except ValueError:
+        return False
+
+
+def warm_worker(_):
+    return os.getpid()
+
+
+def convert_chunk(tasks):
+    results = []
+    for task in tasks:
+        start_time = time.perf_counter()
+        try:
+            result = convert_file(*task)
+        except Exception as e:
+            result = False, str(e), None, None
+        results.append((result, time.perf_counter() - start_time))
+    return results
+
+
+class DaemonBusy(Exception):
+    pass
+
+
+class DaemonForbidden(Exception):
+    pass
+
+
+class ConversionDaemon:
+    def __init__(
+        self,
+        host=DAEMON_HOST,
+        port=DAEMON_PORT,
+        workers=None,
+        max_jobs=None,
+        allow_remote=False,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs = max_jobs or self.workers * DAEMON_CHUNK_SIZE * 2
+        self.condition = threading.Condition()
+        self.running_jobs = 0
+        self.active_requests = 0
+        self.completed_jobs = 0
+        self.draining = False
+        self.server = ThreadingHTTPServer((host, port), DaemonRequestHandler)
+        self.server.daemon_threads = True
+        self.server.conversion_daemon = self
+        if not allow_remote and not is_loopback(self.server.server_address[0]):
+            self.server.server_close()
+            raise ValueError(
+                f"Refusing to listen on non-loopback address {host!r}, "
+                "use --allow-remote to accept connections from other machines"
+            )
+        self.token = write_token(self.server.server_address[1])
+        context = multiprocessing.get_context("spawn")
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=init_worker,
+            initargs=(context.Event(),),
+        )
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def warm_up(self):
+        futures = [
+            self.executor.submit(warm_worker, index) for index in range(self.workers)
+        ]
+        return len({future.result() for future in futures})
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def close(self):
+        self.server.server_close()
+        try:
+            os.remove(token_path(self.server.server_address[1]))
+        except OSError:
+            pass
+
+    def authorize(self, headers, method):
+        if headers.get("Origin") is not None:
+            raise DaemonForbidden("Cross-origin requests are not accepted")
+        if method == "POST":
+            content_type = headers.get("Content-Type") or ""
+            if content_type.split(";", 1)[0].strip().lower() != "application/json":
+                raise DaemonForbidden("Requests must be sent as application/json")
+        token = headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode("utf-8"), self.token.encode("ascii")):
+            raise DaemonForbidden("Missing or wrong daemon token")
+
+    def begin_request(self):
+        with self.condition:
+            if self.draining:
+                raise DaemonBusy("The daemon is shutting down")
+            self.active_requests += 1
+
+    def end_request(self):
+        with self.condition:
+            self.active_requests -= 1
+            self.condition.notify_all()
+
+    def drain(self):
+        with self.condition:
+            self.draining = True
+            self.condition.wait_for(lambda: not self.active_requests)
+        self.server.shutdown()
+        self.executor.shutdown(wait=True)
+
+    def status(self):
+        with self.condition:
+            return {
+                "workers": self.workers,
+                "max_jobs": self.max_jobs,
+                "running_jobs": self.running_jobs,
+                "active_requests": self.active_requests,
+                "completed_jobs": self.completed_jobs,
+                "draining": self.draining,
+            }
+
+    def task(self, job):
+        conversion_type = job.get("conversion_type")
+        if conversion_type not in CONVERTERS:
+            raise ValueError(f"Unknown conversion type: {conversion_type}")
+        job_options = job.get("options", {})
+        if not isinstance(job_options, dict):
+            raise ValueError("Job options must be an object")
+        unknown = set(job_options) - CONVERTER_OPTIONS[conversion_type]
+        if unknown:
+            raise ValueError(
+                f"Unknown options for {conversion_type}: {', '.join(sorted(unknown))}"
+            )
+        options = dict(DEFAULT_OPTIONS[conversion_type], **job_options)
+        if "data" in job:
+            input_path = PrefetchedInput(
+                job.get("name", "input"), base64.b64decode(job["data"])
+            )
+            output_path = None
+        elif isinstance(job.get("input"), str) and isinstance(job.get("output"), str):
+            input_path = job["input"]
+            output_path = job["output"]
+        else:
+            raise ValueError("A job needs either data or an input and output path")
+        return (
+            conversion_type,
+            input_path,
+            output_path,
+            options,
+            bool(job.get("profile")),
+            output_path is None,
+        )
+
+    def submit(self, tasks):
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.running_jobs + len(tasks) <= self.max_jobs
+            )
+            self.running_jobs += len(tasks)
+        try:
+            future = self.executor.submit(convert_chunk, tasks)
+        except BaseException:
+            self.release(len(tasks))
+            raise
+        future.add_done_callback(lambda _: self.release(len(tasks)))
+        return future
+
+    def release(self, count):
+        with self.condition:
+            self.running_jobs -= count
+            self.condition.notify_all()
+
+    def run_jobs(self, jobs):
+        received_time = time.perf_counter()
+        tasks = []
+        errors = {}
+        for index, job in enumerate(jobs):
+            try:
+                tasks.append((index, self.task(job)))
+            except Exception as e:
+                errors[index] = e
+        chunk_size = max(
+            1,
+            min(
+                DAEMON_CHUNK_SIZE,
+                math.ceil(len(tasks) / self.workers),
+                self.max_jobs // self.workers,
+            ),
+        )
+        pending = []
+        for start in range(0, len(tasks), chunk_size):
+            chunk = tasks[start : start + chunk_size]
+            future = self.submit([task for _, task in chunk])
+            pending.append(([index for index, _ in chunk], future, time.perf_counter()))
+        outcomes = {}
+        for indices, future, submitted_time in pending:
+            try:
+                chunk_results = future.result()
+            except Exception as e:
+                chunk_results = [((False, str(e), None, None), 0.0)] * len(indices)
+            for index, (result, convert_time) in zip(indices, chunk_results):
+                outcomes[index] = result, submitted_time - received_time, convert_time
+        results = []
+        for index, job in enumerate(jobs):
+            result = {"name": job.get("name") or job.get("input")}
+            if index in errors:
+                result.update(success=False, error=str(errors[index]))
+                results.append(result)
+                continue
+            (success, message, stats, data), queue_time, convert_time = outcomes[index]
+            result.update(
+                success=success,
+                error=message,
+                queue_seconds=queue_time,
+                convert_seconds=convert_time,
+            )
+            if "output" in job:
+                result["output"] = job["output"]
+            if data is not None:
+                result["data"] = base64.b64encode(data).decode("ascii")
+            if stats:
+                result["stages"] = stats.stages
+                result["counters"] = stats.counters
+            results.append(result)
+        with self.condition:
+            self.completed_jobs += len(results)
+        return results
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "rpgmic"
+    disable_nagle_algorithm = True
+
+    @property
+    def daemon(self):
+        return self.server.conversion_daemon
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def authorized(self):
+        try:
+            self.daemon.authorize(self.headers, self.command)
+        except DaemonForbidden as e:
+            self.close_connection = True
+            self.send_json(403, {"error": str(e)})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self.authorized():
+            return
+        if self.path == "/status":
+            self.send_json(200, self.daemon.status())
+        else:
+            self.send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if not self.authorized():
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_REQUEST_BYTES:
+            self.close_connection = True
+            self.send_json(413, {"error": "Request is too large"})
+            return
+        body = self.rfile.read(length)
+        if self.path == "/shutdown":
+            threading.Thread(target=self.daemon.drain, daemon=True).start()
+            self.send_json(202, {"draining": True})
+            return
+        if self.path != "/convert":
+            self.send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            jobs = json.loads(body)["jobs"]
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        if not isinstance(jobs, list) or not all(isinstance(job, dict) for job in jobs):
+            self.send_json(
+                400, {"error": "Invalid request: jobs must be a list of objects"}
+            )
+            return
+        try:
+            self.daemon.begin_request()
+        except DaemonBusy as e:
+            self.send_json(503, {"error": str(e)})
+            return
+        start_time = time.perf_counter()
+        try:
+            results = self.daemon.run_jobs(jobs)
+        finally:
+            self.daemon.end_request()
+        self.send_json(
+            200, {"results": results, "seconds": time.perf_counter() - start_time}
+        )
+
+
+class DaemonClient:
+    def __init__(self, address=DAEMON_ADDRESS, timeout=None, token=None):
+        url = urllib.parse.urlsplit(address)
+        port = url.port or DAEMON_PORT
+        self.token = token or read_token(port)
+        self.connection = http.client.HTTPConnection(
+            url.hostname, port, timeout=timeout
+        )
+
+    def request(self, method, path, body=None):
+        headers = {TOKEN_HEADER: self.token}
+        payload = None
+        if method == "POST":
+            payload = json.dumps({} if body is None else body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        self.connection.request(method, path, payload, headers)
+        response = self.connection.getresponse()
+        data = json.loads(response.read() or b"{}")
+        if response.status >= 400:
+            raise OSError(data.get("error") or f"HTTP {response.status}")
+        return data
+
+    def convert(self, jobs):
+        return self.request("POST", "/convert", {"jobs": jobs})
+
+    def status(self):
+        return self.request("GET", "/status")
+
+    def shutdown(self):
+        return self.request("POST", "/shutdown")
+
+    def close(self):
+        self.connection.close()
+
+
+def daemon_job(conversion_type, job, options, inline=False, profile=False):
+    input_path, output_path, label = job
+    request = {
+        "conversion_type": conversion_type,
+        "options": options,
+        "name": label,
+        "profile": profile,
+    }
+    if inline or not isinstance(input_path, str):
+        data = prefetch_input(input_path).read()
+        request["data"] = base64.b64encode(data).decode("ascii")
+    else:
+        request["input"] = os.path.abspath(input_path)
+        request["output"] = os.path.abspath(output_path)
+    return request
+
+
+def submit_jobs(
+    client,
+    conversion_type,
+    jobs,
+    options,
+    inline=False,
+    profile=False,
+    batch_size=CLIENT_BATCH_SIZE,
+):
+    jobs = iter(jobs)
+    while True:
+        batch = list(itertools.islice(jobs, batch_size))
+        if not batch:
+            break
+        requests = []
+        for job in batch:
+            try:
+                requests.append(
+                    daemon_job(conversion_type, job, options, inline, profile)
+                )
+            except OSError as e:
+                requests.append({"name": job[2], "error": str(e)})
+        response = client.convert(
+            [request for request in requests if "error" not in request]
+        )
+        results = iter(response["results"])
+        for job, request in zip(batch, requests):
+            if "error" in request:
+                yield job, {"name": job[2], "success": False, "error": request["error"]}
+                continue
+            result = next(results)
+            if result["success"] and "data" in result:
+                try:
+                    make_output_dir(job[1])
+                    with open_output(job[1]) as fh:
+                        fh.write(base64.b64decode(result.pop("data")))
+                except OSError as e:
+                    result.update(success=False, error=str(e))
+            yield job, result
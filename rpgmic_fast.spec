@@ -0,0 +1,78 @@
+# -*- mode: python ; coding: utf-8 -*-
+# Startup-optimized build: a one-dir layout that launches without unpacking
+# anything to a temp folder, no UPX, and only the Qt parts the GUI draws with.
+# Build with `pyinstaller rpgmic_fast.spec` and ship the whole dist/rpgmic folder.
+
+QT_PLATFORMS = ('qwindows', 'qcocoa', 'qxcb', 'qoffscreen', 'qminimal')
+QT_IMAGE_FORMATS = ('qico',)
+QT_UNUSED_LIBRARIES = (
+    'Qt5Quick', 'Qt5Qml', 'Qt5QmlModels', 'Qt5Network', 'Qt5WebSockets',
+    'Qt5WaylandClient', 'Qt5EglFSDeviceIntegration', 'Qt5Pdf', 'Qt5Svg',
+    'Qt5VirtualKeyboard',
+)
+
+
+def keep(entry):
+    name = entry[0].replace('\\', '/')
+    filename = name.rsplit('/', 1)[-1]
+    if '/Qt5/translations/' in name or '/Qt/translations/' in name:
+        return False
+    if '/plugins/' in name:
+        category = name.split('/plugins/', 1)[1].split('/', 1)[0]
+        if category == 'platforms':
+            return any(platform in filename for platform in QT_PLATFORMS)
+        if category == 'imageformats':
+            return any(image_format in filename for image_format in QT_IMAGE_FORMATS)
+        return False
+    return not any(library in filename for library in QT_UNUSED_LIBRARIES)
+
+
+a = Analysis(
+    ['rpgmic.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('icon.ico', '.')],
+    hiddenimports=['rpgmic_core', 'rpgmic_gui', 'rpgmic_daemon', 'PyQt5.QtWidgets', 'PyQt5.QtCore', 'PyQt5.QtGui', 'PIL', 'PIL.Image'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[
+        'tkinter', 'unittest', 'pydoc', 'doctest', 'lib2to3',
+        'PyQt5.QtNetwork', 'PyQt5.QtQml', 'PyQt5.QtQuick', 'PyQt5.QtSvg',
+        'PyQt5.QtPrintSupport', 'PyQt5.QtOpenGL', 'PyQt5.QtDBus',
+        'PIL.ImageQt', 'PIL.ImageTk', 'PIL.AvifImagePlugin', 'PIL._avif',
+    ],
+    noarchive=False,
+    optimize=0,
+)
+a.binaries = [entry for entry in a.binaries if keep(entry)]
+a.datas = [entry for entry in a.datas if keep(entry)]
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='rpgmic',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['icon.ico'],
+)
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='rpgmic',
+)
@@ -0,0 +1,644 @@
+﻿import sys
+import os
+from PyQt5.QtWidgets import (
+    QApplication,
+    QMainWindow,
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QGridLayout,
+    QPushButton,
+    QLabel,
+    QFileDialog,
+    QMessageBox,
+    QProgressBar,
+    QTextEdit,
+    QCheckBox,
+    QComboBox,
+    QStyle,
+)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal, QRect
+from PyQt5.QtGui import QFont, QPalette, QColor, QIcon
+
+STATUS_LOG_LIMIT = 1000
+STARTUP_PROBE_ENV = "RPGMIC_EXIT_AFTER_SHOW"
+
+
+def resource_path(relative_path):
+    try:
+        base_path = sys._MEIPASS
+    except Exception:
+        base_path = os.path.abspath(".")
+    return os.path.join(base_path, relative_path)
+
+
+class ConversionThread(QThread):
+    progress_update = pyqtSignal(int, int, float, float, float, float)
+    conversion_finished = pyqtSignal(list, list)
+    files_changed = pyqtSignal(list, list)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(
+        self,
+        conversion_type,
+        input_paths,
+        output_path,
+        workers=None,
+        options=None,
+        force=False,
+        profile=False,
+        shared_palette=None,
+        watch=False,
+    ):
+        from rpgmic_core import BatchConverter
+
+        super().__init__()
+        self.watch = watch
+        self.batch = BatchConverter(
+            conversion_type,
+            input_paths,
+            output_path,
+            workers,
+            self.progress_update.emit,
+            options=options,
+            force=force,
+            profile=profile,
+            shared_palette=shared_palette,
+        )
+
+    def run(self):
+        try:
+            converted_files, error_messages = self.batch.run()
+            self.conversion_finished.emit(converted_files, error_messages)
+            if self.watch:
+                self.batch.watch(self.files_changed.emit)
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class RPGMakerConverter(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.initUI()
+        self.conversion_thread = None
+        self.current_output_dir = ""
+        self.drag_start_position = None
+        self.is_maximized = False
+        self.normal_geometry = QRect()
+        self.set_application_icon()
+
+    def set_application_icon(self):
+        try:
+            icon_path = resource_path("icon.ico")
+            app_icon = QIcon(icon_path)
+            self.setWindowIcon(app_icon)
+            QApplication.setWindowIcon(app_icon)
+        except Exception:
+            self.setWindowIcon(
+                self.style().standardIcon(getattr(QStyle, "SP_DesktopIcon"))
+            )
+
+    def initUI(self):
+        self.setWindowFlags(Qt.FramelessWindowHint)
+        self.setWindowTitle("RPG Maker Image Converter")
+        self.setFixedSize(800, 820)
+        self.center()
+
+        dark_palette = QPalette()
+        dark_palette.setColor(QPalette.Window, QColor(45, 45, 48))
+        dark_palette.setColor(QPalette.WindowText, Qt.white)
+        dark_palette.setColor(QPalette.Base, QColor(30, 30, 30))
+        dark_palette.setColor(QPalette.AlternateBase, QColor(45, 45, 48))
+        dark_palette.setColor(QPalette.ToolTipBase, Qt.white)
+        dark_palette.setColor(QPalette.ToolTipText, Qt.white)
+        dark_palette.setColor(QPalette.Text, Qt.white)
+        dark_palette.setColor(QPalette.Button, QColor(45, 45, 48))
+        dark_palette.setColor(QPalette.ButtonText, Qt.white)
+        dark_palette.setColor(QPalette.BrightText, Qt.red)
+        dark_palette.setColor(QPalette.Highlight, QColor(0, 122, 204))
+        dark_palette.setColor(QPalette.HighlightedText, Qt.black)
+        self.setPalette(dark_palette)
+
+        font = QFont("Segoe UI", 10)
+        self.setFont(font)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.setSpacing(15)
+        main_layout.setContentsMargins(30, 40, 30, 30)
+
+        header_layout = QHBoxLayout()
+
+        author_label = QLabel("Rafaelmorai")
+        author_font = QFont("Segoe UI", 9)
+        author_label.setFont(author_font)
+        author_label.setStyleSheet("color: #A0A0A0;")
+        header_layout.addWidget(author_label)
+
+        header_layout.addStretch()
+
+        self.minimize_btn = QPushButton("−")
+        self.minimize_btn.setFixedSize(30, 30)
+        self.minimize_btn.setStyleSheet(
+            """
+            QPushButton {
+                background: #5A5A5A;
+                color: white;
+                border: none;
+                border-radius: 15px;
+                font-weight: bold;
+                font-size: 16px;
+                padding-top: -2px;
+            }
+            QPushButton:hover {
+                background: #6A6A6A;
+            }
+            QPushButton:pressed {
+                background: #4A4A4A;
+            }
+        """
+        )
+        self.minimize_btn.clicked.connect(self.showMinimized)
+        header_layout.addWidget(self.minimize_btn)
+
+        self.maximize_btn = QPushButton("🗖")
+        self.maximize_btn.setFixedSize(30, 30)
+        self.maximize_btn.setStyleSheet(
+            """
+            QPushButton {
+                background: #5A5A5A;
+                color: white;
+                border: none;
+                border-radius: 15px;
+                font-weight: bold;
+                font-size: 16px;
+                padding-top: -2px;
+            }
+            QPushButton:hover {
+                background: #6A6A6A;
+            }
+            QPushButton:pressed {
+                background: #4A4A4A;
+            }
+        """
+        )
+        self.maximize_btn.clicked.connect(self.toggle_maximize)
+        header_layout.addWidget(self.maximize_btn)
+
+        self.close_btn = QPushButton("×")
+        self.close_btn.setFixedSize(30, 30)
+        self.close_btn.setStyleSheet(
+            """
+            QPushButton {
+                background: #5A5A5A;
+                color: white;
+                border: none;
+                border-radius: 15px;
+                font-weight: bold;
+                font-size: 16px;
+                padding-top: -2px;
+            }
+            QPushButton:hover {
+                background: #FF5555;
+            }
+            QPushButton:pressed {
+                background: #FF3333;
+            }
+        """
+        )
+        self.close_btn.clicked.connect(self.close)
+        header_layout.addWidget(self.close_btn)
+
+        main_layout.addLayout(header_layout)
+
+        title_label = QLabel("RPG Maker Image Converter")
+        title_font = QFont("Segoe UI", 24, QFont.Bold)
+        title_label.setFont(title_font)
+        title_label.setAlignment(Qt.AlignCenter)
+        title_label.setStyleSheet("color: #E1E1E1; margin: 20px 0 10px 0;")
+        main_layout.addWidget(title_label)
+
+        description_label = QLabel(
+            "Tool for converting images between PNG and XYZ formats\n"
+            "compatible with RPG Maker 2000 and 2003. Preserves the folder\n"
+            "structure and converts images to the required 256-color format."
+        )
+        description_font = QFont("Segoe UI", 10)
+        description_label.setFont(description_font)
+        description_label.setAlignment(Qt.AlignCenter)
+        description_label.setStyleSheet("color: #C0C0C0; margin-bottom: 10px;")
+        description_label.setWordWrap(True)
+        main_layout.addWidget(description_label)
+
+        info_label = QLabel(
+            "Click 'Cancel' in the file selection dialog to switch to folder selection mode"
+        )
+        info_font = QFont("Segoe UI", 9)
+        info_label.setFont(info_font)
+        info_label.setAlignment(Qt.AlignCenter)
+        info_label.setStyleSheet("color: #808080; margin-bottom: 20px;")
+        info_label.setWordWrap(True)
+        main_layout.addWidget(info_label)
+
+        buttons_layout = QHBoxLayout()
+        buttons_layout.setSpacing(20)
+
+        self.xyz2png_btn = QPushButton("XYZ to PNG")
+        self.xyz2png_btn.setMinimumSize(200, 45)
+        self.xyz2png_btn.setStyleSheet(self.get_button_style())
+        self.xyz2png_btn.clicked.connect(lambda: self.start_conversion("xyz2png"))
+        buttons_layout.addWidget(self.xyz2png_btn)
+
+        self.to256colors_btn = QPushButton("To 256 Colors")
+        self.to256colors_btn.setMinimumSize(200, 45)
+        self.to256colors_btn.setStyleSheet(self.get_button_style())
+        self.to256colors_btn.clicked.connect(
+            lambda: self.start_conversion("to256colors")
+        )
+        buttons_layout.addWidget(self.to256colors_btn)
+
+        self.png2xyz_btn = QPushButton("PNG to XYZ")
+        self.png2xyz_btn.setMinimumSize(200, 45)
+        self.png2xyz_btn.setStyleSheet(self.get_button_style())
+        self.png2xyz_btn.clicked.connect(lambda: self.start_conversion("png2xyz"))
+        buttons_layout.addWidget(self.png2xyz_btn)
+
+        main_layout.addLayout(buttons_layout)
+
+        options_layout = QGridLayout()
+        options_layout.setHorizontalSpacing(20)
+
+        self.force_rebuild_checkbox = QCheckBox("Rebuild all files")
+        self.force_rebuild_checkbox.setToolTip(
+            "Also convert files that are already up to date"
+        )
+        self.force_rebuild_checkbox.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(self.force_rebuild_checkbox, 0, 0)
+
+        self.profile_checkbox = QCheckBox("Write a timing report")
+        self.profile_checkbox.setToolTip("Per-stage totals and slowest files")
+        self.profile_checkbox.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(self.profile_checkbox, 0, 1)
+
+        self.rgba_output_checkbox = QCheckBox("XYZ to PNG: save 32-bit RGBA")
+        self.rgba_output_checkbox.setToolTip(
+            "Save XYZ to PNG output as 32-bit RGBA instead of 8-bit indexed"
+        )
+        self.rgba_output_checkbox.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(self.rgba_output_checkbox, 1, 0)
+
+        self.shared_palette_checkbox = QCheckBox("To 256 Colors: one shared palette")
+        self.shared_palette_checkbox.setToolTip(
+            "Build one palette from all selected images and map every image to it"
+        )
+        self.shared_palette_checkbox.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(self.shared_palette_checkbox, 1, 1)
+
+        quantizer_label = QLabel("To 256 Colors quality:")
+        quantizer_label.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(quantizer_label, 2, 0, alignment=Qt.AlignRight)
+
+        self.quantizer_combo = QComboBox()
+        self.quantizer_combo.addItem("Fast (octree)", "fast")
+        self.quantizer_combo.addItem("Balanced (median cut)", "balanced")
+        self.quantizer_combo.addItem("Quality (median cut + k-means, slow)", "quality")
+        self.quantizer_combo.setCurrentIndex(1)
+        self.quantizer_combo.setStyleSheet(self.get_combo_style())
+        options_layout.addWidget(self.quantizer_combo, 2, 1)
+
+        compression_label = QLabel("Output compression:")
+        compression_label.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(compression_label, 3, 0, alignment=Qt.AlignRight)
+
+        self.compression_combo = QComboBox()
+        self.compression_combo.addItem("Fast (zlib level 1)", "fast")
+        self.compression_combo.addItem("Default (zlib level 6)", "default")
+        self.compression_combo.addItem("Smallest (level 9 + PNG optimize)", "smallest")
+        self.compression_combo.setCurrentIndex(1)
+        self.compression_combo.setStyleSheet(self.get_combo_style())
+        options_layout.addWidget(self.compression_combo, 3, 1)
+
+        self.watch_checkbox = QCheckBox("Keep watching the folder for changes")
+        self.watch_checkbox.setToolTip(
+            "After converting a folder, convert each file again as soon as it is "
+            "created or saved, until Cancel is clicked"
+        )
+        self.watch_checkbox.setStyleSheet("color: #C0C0C0;")
+        options_layout.addWidget(self.watch_checkbox, 4, 0, 1, 2, Qt.AlignCenter)
+
+        main_layout.addLayout(options_layout)
+        main_layout.setAlignment(options_layout, Qt.AlignCenter)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setStyleSheet(
+            """
+            QProgressBar {
+                border: 2px solid #3A3A3A;
+                border-radius: 0px;
+                text-align: center;
+                background: #2D2D2D;
+                height: 20px;
+                color: white;
+            }
+            QProgressBar::chunk {
+                background: #007ACC;
+                border-radius: 0px;
+            }
+        """
+        )
+        self.progress_bar.setFormat("%v/%m files")
+        main_layout.addWidget(self.progress_bar)
+
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setMinimumSize(120, 30)
+        self.cancel_btn.setStyleSheet(self.get_button_style())
+        self.cancel_btn.setToolTip(
+            "Stop after the files in progress; finished files are kept and "
+            "the next run resumes from there"
+        )
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_conversion)
+        main_layout.addWidget(self.cancel_btn, alignment=Qt.AlignCenter)
+
+        status_label = QLabel("Status:")
+        status_label.setStyleSheet("color: #E1E1E1; margin-top: 20px;")
+        main_layout.addWidget(status_label)
+
+        self.status_text = QTextEdit()
+        self.status_text.setReadOnly(True)
+        self.status_text.document().setMaximumBlockCount(STATUS_LOG_LIMIT)
+        self.status_text.setMaximumHeight(150)
+        self.status_text.setStyleSheet(
+            """
+            QTextEdit {
+                background: #2D2D2D;
+                border: 1px solid #3A3A3A;
+                border-radius: 5px;
+                color: #E1E1E1;
+                padding: 5px;
+            }
+        """
+        )
+        main_layout.addWidget(self.status_text)
+
+    def get_button_style(self):
+        return """
+            QPushButton {
+                background: #5A5A5A;
+                color: white;
+                border: none;
+                border-radius: 4px;
+                font-weight: bold;
+                font-size: 14px;
+                padding: 8px;
+            }
+            QPushButton:hover {
+                background: #6A6A6A;
+            }
+            QPushButton:pressed {
+                background: #4A4A4A;
+            }
+            QPushButton:disabled {
+                background: #404040;
+                color: #A0A0A0;
+            }
+        """
+
+    def get_combo_style(self):
+        return """
+            QComboBox {
+                background: #3A3A3A;
+                border: 1px solid #4A4A4A;
+                border-radius: 5px;
+                color: #E1E1E1;
+                padding: 3px 8px;
+            }
+            QComboBox QAbstractItemView {
+                background: #3A3A3A;
+                color: #E1E1E1;
+                selection-background-color: #5A5A5A;
+            }
+        """
+
+    def center(self):
+        frame_geometry = self.frameGeometry()
+        center_point = QApplication.primaryScreen().availableGeometry().center()
+        frame_geometry.moveCenter(center_point)
+        self.move(frame_geometry.topLeft())
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_start_position = (
+                event.globalPos() - self.frameGeometry().topLeft()
+            )
+            event.accept()
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() == Qt.LeftButton and self.drag_start_position is not None:
+            self.move(event.globalPos() - self.drag_start_position)
+            event.accept()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.drag_start_position = None
+            event.accept()
+
+    def toggle_maximize(self):
+        if self.is_maximized:
+            self.showNormal()
+            self.is_maximized = False
+        else:
+            self.normal_geometry = self.geometry()
+            self.showMaximized()
+            self.is_maximized = True
+
+    def start_conversion(self, conversion_type):
+        from rpgmic_core import default_output_dir, encoder_options
+
+        if conversion_type == "xyz2png":
+            file_types = "XYZ Files (*.xyz);;Zip Archives (*.zip);;All Files (*)"
+            title = "Select XYZ file(s)"
+        else:
+            file_types = "PNG Files (*.png);;Zip Archives (*.zip);;All Files (*)"
+            title = "Select PNG file(s)"
+        default_output = default_output_dir(conversion_type)
+
+        options = QFileDialog.Options()
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, title, "", file_types, options=options
+        )
+
+        folder_path = ""
+        if not file_paths:
+            folder_path = QFileDialog.getExistingDirectory(
+                self, "Select folder", options=options
+            )
+
+        if not file_paths and not folder_path:
+            return
+
+        if file_paths:
+            input_path = file_paths
+            is_folder = False
+            os.makedirs(default_output, exist_ok=True)
+            if all(path.lower().endswith(".zip") for path in file_paths):
+                default_output = os.path.join(
+                    default_output, os.path.basename(file_paths[0])
+                )
+        else:
+            input_path = folder_path
+            is_folder = True
+
+        self.current_output_dir = default_output
+        self.set_buttons_enabled(False)
+
+        options = {}
+        if conversion_type == "xyz2png":
+            options["png_mode"] = (
+                "RGBA" if self.rgba_output_checkbox.isChecked() else "P"
+            )
+        elif conversion_type == "to256colors":
+            options["quantizer"] = self.quantizer_combo.currentData()
+        encoder = encoder_options(self.compression_combo.currentData())
+        if encoder:
+            options["encoder"] = encoder
+        self.conversion_thread = ConversionThread(
+            conversion_type,
+            input_path,
+            default_output,
+            options=options,
+            force=self.force_rebuild_checkbox.isChecked(),
+            profile=self.profile_checkbox.isChecked(),
+            shared_palette="auto" if self.shared_palette_checkbox.isChecked() else None,
+            watch=is_folder and self.watch_checkbox.isChecked(),
+        )
+        self.conversion_thread.progress_update.connect(self.update_progress)
+        self.conversion_thread.conversion_finished.connect(self.conversion_complete)
+        self.conversion_thread.files_changed.connect(self.changes_converted)
+        if self.conversion_thread.watch:
+            self.conversion_thread.finished.connect(self.watch_stopped)
+        self.conversion_thread.error_occurred.connect(self.conversion_error)
+        self.conversion_thread.start()
+
+        self.progress_bar.setVisible(True)
+        self.status_text.append("Starting conversion...")
+
+    def cancel_conversion(self):
+        self.cancel_btn.setEnabled(False)
+        self.conversion_thread.batch.cancel()
+        self.status_text.append("Cancelling after the files in progress...")
+
+    def update_progress(self, current, total, *rates):
+        from rpgmic_core import format_progress
+
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(current)
+        self.progress_bar.setFormat(f"{current}/{total} files")
+        self.status_text.append(format_progress(current, total, *rates))
+        self.status_text.verticalScrollBar().setValue(
+            self.status_text.verticalScrollBar().maximum()
+        )
+
+    def conversion_complete(self, converted_files, error_messages):
+        if not self.conversion_thread.watch:
+            self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setMaximum(100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
+        summary = f"Conversion complete!\n\nConverted {len(converted_files)} files."
+        if self.conversion_thread.batch.cancelled:
+            summary = (
+                f"Conversion cancelled.\n\nConverted {len(converted_files)} files. "
+                "Convert the same files again to resume."
+            )
+        up_to_date_files = self.conversion_thread.batch.up_to_date_files
+        if up_to_date_files:
+            summary += f"\nSkipped {len(up_to_date_files)} files already up to date."
+        deduplicated_files = self.conversion_thread.batch.deduplicated_files
+        if deduplicated_files:
+            time_saved = self.conversion_thread.batch.dedup_time_saved
+            summary += (
+                f"\nDeduplicated {len(deduplicated_files)} identical files "
+                f"(about {time_saved:.1f} s saved)."
+            )
+        if error_messages:
+            summary += f"\n\nEncountered {len(error_messages)} errors:"
+            for error in error_messages[:5]:
+                summary += f"\n• {error}"
+            if len(error_messages) > 5:
+                summary += f"\n• ... and {len(error_messages) - 5} more errors"
+        summary += f"\n\nFiles saved to: {self.current_output_dir}"
+        palette_file = self.conversion_thread.batch.palette_file
+        if palette_file:
+            summary += f"\nShared palette saved to: {palette_file}"
+        report = self.conversion_thread.batch.report
+        if report:
+            summary += f"\n\n{report.format()}"
+        if self.conversion_thread.watch and not self.conversion_thread.batch.cancelled:
+            summary += "\n\nWatching the folder for changes. Click Cancel to stop."
+        self.status_text.append(summary)
+        self.status_text.verticalScrollBar().setValue(
+            self.status_text.verticalScrollBar().maximum()
+        )
+
+    def changes_converted(self, converted_files, error_messages):
+        self.progress_bar.setVisible(False)
+        for output_path in converted_files:
+            self.status_text.append(f"Converted: {output_path}")
+        for error in error_messages:
+            self.status_text.append(error)
+        self.status_text.verticalScrollBar().setValue(
+            self.status_text.verticalScrollBar().maximum()
+        )
+
+    def watch_stopped(self):
+        self.set_buttons_enabled(True)
+        self.status_text.append("Stopped watching.")
+
+    def conversion_error(self, error_message):
+        self.set_buttons_enabled(True)
+        self.progress_bar.setVisible(False)
+        self.progress_bar.setMaximum(100)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat("%p%")
+        self.status_text.append(f"Error: {error_message}")
+        self.status_text.verticalScrollBar().setValue(
+            self.status_text.verticalScrollBar().maximum()
+        )
+        QMessageBox.critical(
+            self, "Conversion Error", f"An error occurred: {error_message}"
+        )
+
+    def set_buttons_enabled(self, enabled):
+        self.xyz2png_btn.setEnabled(enabled)
+        self.to256colors_btn.setEnabled(enabled)
+        self.png2xyz_btn.setEnabled(enabled)
+        self.force_rebuild_checkbox.setEnabled(enabled)
+        self.rgba_output_checkbox.setEnabled(enabled)
+        self.profile_checkbox.setEnabled(enabled)
+        self.shared_palette_checkbox.setEnabled(enabled)
+        self.quantizer_combo.setEnabled(enabled)
+        self.compression_combo.setEnabled(enabled)
+        self.watch_checkbox.setEnabled(enabled)
+        self.cancel_btn.setVisible(not enabled)
+        self.cancel_btn.setEnabled(not enabled)
+
+
+def main():
+    app = QApplication(sys.argv)
+    app.setStyle("Fusion")
+    try:
+        icon_path = resource_path("icon.ico")
+        app_icon = QIcon(icon_path)
+        app.setWindowIcon(app_icon)
+    except Exception:
+        pass
+    converter = RPGMakerConverter()
+    converter.show()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        QTimer.singleShot(0, app.quit)
+    return app.exec_()
@@ -0,0 +1,108 @@
+﻿import json
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rpgmic_core
+
+
+def write_image(path, color, size=(4, 4)):
+    Image.new("RGB", size, color).save(path, compress_level=0)
+
+
+def convert(input_dir, output_dir):
+    batch = rpgmic_core.BatchConverter("to256colors", input_dir, output_dir, 1)
+    converted, errors = batch.run()
+    assert errors == []
+    return batch, converted
+
+
+def manifest_entries(output_dir):
+    return rpgmic_core.BuildManifest(output_dir).entries
+
+
+def test_unchanged_input_is_skipped(tmp_path):
+    input_dir = str(tmp_path / "in")
+    output_dir = str(tmp_path / "out")
+    os.makedirs(input_dir)
+    write_image(os.path.join(input_dir, "a.png"), (255, 0, 0))
+    write_image(os.path.join(input_dir, "b.png"), (0, 255, 0))
+    batch, converted = convert(input_dir, output_dir)
+    assert len(converted) == 2
+    assert batch.up_to_date_files == []
+    assert sorted(manifest_entries(output_dir)) == ["in/a.png", "in/b.png"]
+
+    batch, converted = convert(input_dir, output_dir)
+    assert converted == []
+    assert len(batch.up_to_date_files) == 2
+
+    os.utime(os.path.join(input_dir, "a.png"), ns=(0, 10**18))
+    batch, converted = convert(input_dir, output_dir)
+    assert converted == []
+    assert len(batch.up_to_date_files) == 2
+
+
+def test_edited_input_is_reconverted(tmp_path):
+    input_dir = str(tmp_path / "in")
+    output_dir = str(tmp_path / "out")
+    os.makedirs(input_dir)
+    input_path = os.path.join(input_dir, "a.png")
+    write_image(input_path, (255, 0, 0))
+    write_image(os.path.join(input_dir, "b.png"), (0, 255, 0))
+    convert(input_dir, output_dir)
+    size = os.path.getsize(input_path)
+
+    write_image(input_path, (0, 0, 255))
+    assert os.path.getsize(input_path) == size
+    os.utime(input_path, ns=(0, 10**18))
+    batch, converted = convert(input_dir, output_dir)
+    assert len(converted) == 1
+    assert [os.path.basename(path) for path in batch.up_to_date_files] == ["b.png"]
+    with Image.open(os.path.join(output_dir, "in", "a.png")) as img:
+        assert img.convert("RGB").getpixel((0, 0)) == (0, 0, 255)
+    assert manifest_entries(output_dir)["in/a.png"]["hash"] == (
+        rpgmic_core.source_digest(input_path)
+    )
+
+
+def test_deleted_input_drops_entry(tmp_path):
+    input_path = str(tmp_path / "a.png")
+    output_dir = str(tmp_path / "out")
+    output_path = os.path.join(output_dir, "a.png")
+    write_image(input_path, (255, 0, 0))
+    job = input_path, output_path, "a.png"
+    manifest = rpgmic_core.BuildManifest(output_dir)
+    assert not manifest.check(job, "to256colors", {})
+    os.remove(input_path)
+    manifest.record(output_path, True)
+    assert manifest.check(job, "to256colors", {}) is False
+    manifest.save()
+    assert manifest_entries(output_dir) == {}
+
+
+def test_truncated_journal_is_replayed(tmp_path):
+    output_dir = str(tmp_path / "out")
+    manifest = rpgmic_core.BuildManifest(output_dir)
+    for name in ("a.png", "b.png"):
+        input_path = str(tmp_path / name)
+        output_path = os.path.join(output_dir, name)
+        write_image(input_path, (255, 0, 0))
+        manifest.check((input_path, output_path, name), "to256colors", {})
+        manifest.record(output_path, True)
+    manifest.journal.close()
+    journal_path = os.path.join(output_dir, rpgmic_core.JOURNAL_FILENAME)
+    with open(journal_path, "rb") as fh:
+        journal = fh.read()
+    with open(journal_path, "wb") as fh:
+        fh.write(journal[:-10])
+
+    manifest = rpgmic_core.BuildManifest(output_dir)
+    assert list(manifest.entries) == ["a.png"]
+    manifest.save()
+    assert not os.path.exists(journal_path)
+    with open(os.path.join(output_dir, rpgmic_core.MANIFEST_FILENAME)) as fh:
+        data = json.load(fh)
+    assert list(data["entries"]) == ["a.png"]
@@ -0,0 +1,85 @@
+﻿import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rpgmic_core
+
+OPAQUE_PIXELS = {
+    (1, 1): (0, 0, 0, 255),
+    (2, 1): (255, 0, 0, 255),
+    (3, 2): (40, 200, 90, 255),
+    (4, 4): (250, 250, 250, 255),
+}
+
+
+def write_sprites(folder, count=2):
+    os.makedirs(folder)
+    for number in range(count):
+        img = Image.new("RGBA", (8, 8), (0, 0, 0, 0))
+        for position, color in OPAQUE_PIXELS.items():
+            img.putpixel(position, color)
+        img.putpixel((number, 6), (10 * number, 0, 200, 255))
+        img.save(os.path.join(folder, f"sprite{number}.png"))
+
+
+def converted_pixels(output_root):
+    for root, _, files in os.walk(output_root):
+        for file in files:
+            if file.startswith("sprite"):
+                with Image.open(os.path.join(root, file)) as img:
+                    assert img.mode == "P"
+                    yield file, img.convert("RGBA")
+
+
+def assert_alpha_kept(output_root):
+    outputs = dict(converted_pixels(output_root))
+    assert len(outputs) == 2
+    for file, img in outputs.items():
+        assert img.getpixel((0, 0)) == (0, 0, 0, 0)
+        assert img.getpixel((7, 7)) == (0, 0, 0, 0)
+        for position, color in OPAQUE_PIXELS.items():
+            assert img.getpixel(position) == color
+        number = int(file[len("sprite")])
+        assert img.getpixel((number, 6)) == (10 * number, 0, 200, 255)
+
+
+def test_shared_palette_keeps_transparency(tmp_path):
+    input_dir = str(tmp_path / "sprites")
+    write_sprites(input_dir)
+    batch = rpgmic_core.BatchConverter(
+        "to256colors",
+        input_dir,
+        str(tmp_path / "shared"),
+        1,
+        shared_palette=rpgmic_core.SHARED_PALETTE_AUTO,
+    )
+    converted, errors = batch.run()
+    assert errors == []
+    assert len(converted) == 2
+    assert_alpha_kept(str(tmp_path / "shared"))
+    palette, transparency = rpgmic_core.load_palette(batch.palette_file)
+    assert transparency == 0
+
+    batch = rpgmic_core.BatchConverter(
+        "to256colors",
+        input_dir,
+        str(tmp_path / "remapped"),
+        1,
+        shared_palette=batch.palette_file,
+    )
+    converted, errors = batch.run()
+    assert errors == []
+    assert_alpha_kept(str(tmp_path / "remapped"))
+
+
+def test_opaque_images_get_no_transparent_entry(tmp_path):
+    input_dir = tmp_path / "opaque"
+    input_dir.mkdir()
+    Image.new("RGB", (4, 4), (0, 0, 0)).save(input_dir / "black.png")
+    palette, transparency = rpgmic_core.build_shared_palette(
+        [str(input_dir / "black.png")]
+    )
+    assert (palette, transparency) == (bytes(3), None)
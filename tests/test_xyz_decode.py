@@ -0,0 +1,100 @@
+﻿import io
+import os
+import sys
+import zlib
+import random
+import struct
+import threading
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rpgmic_core
+
+SEED = 2000
+
+SIZES = [(1, 1), (17, 5), (1, 300), (300, 1), (64, 48), (640, 480)]
+
+
+def xyz_bytes(width, height, seed, truncate=0):
+    rng = random.Random(seed)
+    palette = bytes(rng.randrange(256) for _ in range(768))
+    indices = bytes(rng.randrange(256) for _ in range(width * height))
+    plane = palette + indices
+    if truncate:
+        plane = plane[:-truncate]
+    return b"XYZ1" + struct.pack("=HH", width, height) + zlib.compress(plane)
+
+
+def per_pixel_decode(data):
+    input_fh = io.BytesIO(data)
+    assert input_fh.read(4) == b"XYZ1"
+    width, height = struct.unpack("=HH", input_fh.read(4))
+    rest = io.BytesIO(zlib.decompress(input_fh.read()))
+    palette = []
+    for x in range(256):
+        r, g, b = struct.unpack("=3B", rest.read(3))
+        palette.append((r, g, b))
+    output_image = Image.new("RGBA", (width, height))
+    output_pixels = output_image.load()
+    for y in range(height):
+        for x in range(width):
+            output_pixels[x, y] = palette[ord(rest.read(1))]
+    return output_image
+
+
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: f"{size[0]}x{size[1]}")
+def test_frombuffer_matches_per_pixel_loop(size):
+    data = xyz_bytes(*size, SEED + size[0] * 7 + size[1])
+    expected = per_pixel_decode(data)
+    image = rpgmic_core.decode_xyz(data)
+    assert image.mode == "P"
+    assert image.size == size
+    assert image.convert("RGBA").tobytes() == expected.tobytes()
+
+
+@pytest.mark.parametrize("png_mode", rpgmic_core.PNG_MODES)
+@pytest.mark.parametrize("size", SIZES, ids=lambda size: f"{size[0]}x{size[1]}")
+def test_saved_png_matches_per_pixel_loop(tmp_path, size, png_mode):
+    data = xyz_bytes(*size, SEED + size[0] * 7 + size[1])
+    input_path = tmp_path / "input.xyz"
+    input_path.write_bytes(data)
+    output_path = tmp_path / "output.png"
+    assert rpgmic_core.convert_xyz_to_png(
+        str(input_path), str(output_path), png_mode
+    ) == (True, None)
+    with Image.open(output_path) as saved:
+        assert saved.mode == png_mode
+        assert saved.convert("RGBA").tobytes() == per_pixel_decode(data).tobytes()
+
+
+@pytest.mark.parametrize("truncate", [1, 100, 768 + 16 * 16])
+def test_truncated_plane_is_rejected(tmp_path, truncate):
+    data = xyz_bytes(16, 16, SEED, truncate)
+    with pytest.raises(ValueError, match="Truncated image data"):
+        rpgmic_core.decode_xyz(data)
+    input_path = tmp_path / "input.xyz"
+    input_path.write_bytes(data)
+    output_path = tmp_path / "output.png"
+    assert rpgmic_core.convert_xyz_to_png(str(input_path), str(output_path)) == (
+        False,
+        "Truncated image data",
+    )
+    assert not output_path.exists()
+
+
+def test_api_ignores_the_batch_cancel_event(monkeypatch):
+    event = threading.Event()
+    event.set()
+    monkeypatch.setattr(rpgmic_core, "cancel_event", event)
+    data = xyz_bytes(17, 5, SEED)
+    image = rpgmic_core.decode_xyz(data)
+    assert rpgmic_core.decode_xyz(rpgmic_core.encode_xyz(image)).tobytes() == (
+        image.tobytes()
+    )
+    with pytest.raises(rpgmic_core.ConversionCancelled):
+        rpgmic_core.decode_xyz(data, cancel_event=event)
+    with pytest.raises(rpgmic_core.ConversionCancelled):
+        rpgmic_core.encode_xyz(image, cancel_event=event)